@@ -0,0 +1,136 @@
+"""
+Representative data to benchmark. Each payload has a name, a function that creates the data, and the keyword
+arguments for `dumps` and `loads`. Payloads that need a missing optional library are skipped.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+
+class Payload(object):
+	def __init__(self, name, make, dumps_kwargs=None, loads_kwargs=None, requires=(), text=False):
+		"""
+		:param make: Function without arguments that returns the data.
+		:param requires: Modules that are needed to make the data, or it is skipped.
+		:param text: If True, `make` returns json text, and only loading is measured.
+		"""
+		self.name = name
+		self.make = make
+		self.dumps_kwargs = dumps_kwargs or {}
+		self.loads_kwargs = loads_kwargs or {}
+		self.requires = requires
+		self.text = text
+
+
+class Point(object):
+	def __init__(self, x, y, label):
+		self.x = x
+		self.y = y
+		self.label = label
+
+
+def nested_dicts(n=2000):
+	return [OrderedDict((
+		('id', k),
+		('name', 'item {0:d}'.format(k)),
+		('active', k % 3 == 0),
+		('score', k * 0.37),
+		('tags', ['a', 'b', 'c'][:k % 4]),
+		('child', {'depth': 1, 'values': list(range(k % 7)), 'parent': None}),
+	)) for k in range(n)]
+
+
+def datetimes(n=10000):
+	start = datetime(2020, 1, 1, 12, 30)
+	return [start + timedelta(minutes=7 * k, microseconds=k) for k in range(n)]
+
+
+def aware_datetimes(n=10000):
+	from pytz import timezone
+	zone = timezone('Europe/Amsterdam')
+	start = datetime(2020, 1, 1, 12, 30)
+	return [zone.localize(start + timedelta(minutes=7 * k, microseconds=k)) for k in range(n)]
+
+
+def class_instances(n=5000):
+	return [Point(k, -k, 'p{0:d}'.format(k)) for k in range(n)]
+
+
+def sets(n=2000):
+	return [set(range(k % 10)) for k in range(n)]
+
+
+def decimals(n=10000):
+	return [Decimal(k) / Decimal(7) for k in range(n)]
+
+
+def numpy_arrays(n=20):
+	from numpy import arange
+	return [arange(10000, dtype='float64').reshape((100, 100)) * k for k in range(n)]
+
+
+def numpy_repeated(n=50):
+	from numpy import arange
+	masks = [(arange(10000) % (k % 5 + 2) == 0).reshape((100, 100)) for k in range(n)]
+	return [{'mask': mask, 'weights': arange(10000, dtype='float64')} for mask in masks]
+
+
+def pandas_frame(n=2000):
+	from numpy import arange
+	from pandas import DataFrame
+	return DataFrame(OrderedDict((
+		('int', arange(n)),
+		('float', arange(n) * 0.5),
+		('text', ['row {0:d}'.format(k) for k in range(n)]),
+	)))
+
+
+def shared_tables(n=200):
+	tables = [OrderedDict(('key_{0:d}'.format(k), list(range(k, k + 50))) for k in range(100)) for _ in range(5)]
+	return [OrderedDict((('id', k), ('lookup', tables[k % 5]), ('point', Point(k, -k, 'p')))) for k in range(n)]
+
+
+def commented_json(n=2000):
+	return '{\n' + ''.join('\t"key_{0:d}": "value # {0:d}", "n{0:d}": [1, 2, 3], // comment {0:d}\n'.format(k)
+		for k in range(n)) + '\t"end": true  # last\n}\n'
+
+
+def urls_json(n=5000):
+	# no comments, but many comment symbols inside strings
+	return '[' + ', '.join('{{"id": {0:d}, "url": "https://example.com/items/{0:d}#top", "icon": "//cdn.example.com/{0:d}.png"}}'
+		.format(k) for k in range(n)) + ']'
+
+
+PAYLOADS = [
+	Payload('nested_dicts', nested_dicts),
+	Payload('datetimes', datetimes),
+	Payload('datetimes_compact', datetimes, dumps_kwargs=dict(properties=dict(datetime_compact=True))),
+	Payload('datetimes_packed', datetimes, dumps_kwargs=dict(properties=dict(pack_lists=True))),
+	Payload('aware_datetimes', aware_datetimes, requires=('pytz',)),
+	Payload('aware_datetimes_packed', aware_datetimes, dumps_kwargs=dict(properties=dict(pack_lists=True)),
+		requires=('pytz',)),
+	Payload('class_instances', class_instances),
+	Payload('sets', sets),
+	Payload('decimals', decimals),
+	Payload('decimals_packed', decimals, dumps_kwargs=dict(properties=dict(pack_lists=True))),
+	Payload('numpy_list', numpy_arrays, dumps_kwargs=dict(properties=dict(ndarray_compact=False)), requires=('numpy',)),
+	Payload('numpy_compact', numpy_arrays, dumps_kwargs=dict(properties=dict(ndarray_compact=True)), requires=('numpy',)),
+	Payload('numpy_compact_gzip', numpy_arrays, dumps_kwargs=dict(compression=True,
+		properties=dict(ndarray_compact=True)), requires=('numpy',)),
+	Payload('numpy_repeated', numpy_repeated, dumps_kwargs=dict(compression=True,
+		properties=dict(ndarray_compact=True)), requires=('numpy',)),
+	Payload('numpy_repeated_dedup', numpy_repeated, dumps_kwargs=dict(compression=True,
+		properties=dict(ndarray_compact=True, ndarray_dedup=True)), loads_kwargs=dict(properties=dict(ndarray_dedup=True)),
+		requires=('numpy',)),
+	Payload('pandas_frame', pandas_frame, requires=('numpy', 'pandas')),
+	Payload('pandas_columnar', pandas_frame, dumps_kwargs=dict(properties=dict(pandas_columnar=True,
+		ndarray_compact=True)), requires=('numpy', 'pandas')),
+	Payload('shared_tables', shared_tables),
+	Payload('shared_tables_references', shared_tables, dumps_kwargs=dict(properties=dict(references=True)),
+		loads_kwargs=dict(properties=dict(references=True))),
+	Payload('nested_dicts_references', nested_dicts, dumps_kwargs=dict(properties=dict(references=True)),
+		loads_kwargs=dict(properties=dict(references=True))),
+	Payload('commented_json', commented_json, loads_kwargs=dict(ignore_comments=True), text=True),
+	Payload('urls_json', urls_json, text=True),
+]
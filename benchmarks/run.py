@@ -0,0 +1,157 @@
+"""
+Benchmarks for json_tricks `dumps` and `loads`, measuring time and peak memory for several kinds of data.
+
+Every payload is also encoded and decoded with the standard library `json`, using the same json document
+(without the json_tricks extras). Times are reported relative to that baseline too, which makes results from
+different machines comparable. Run from the repository root:
+
+	python benchmarks/run.py
+	python benchmarks/run.py --only datetimes,decimals --save before.json
+	python benchmarks/run.py --compare before.json
+
+With `--compare`, the exit code is 1 if any ratio to the baseline became slower than the tolerance.
+"""
+
+import json
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from os.path import abspath, dirname
+from timeit import Timer
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from json_tricks import dumps, loads, strip_comments  # noqa: E402
+from json_tricks.compression import detect_compression  # noqa: E402
+from json_tricks.utils import is_module_available  # noqa: E402
+from payloads import PAYLOADS  # noqa: E402
+
+
+def measure_time(func, repeat):
+	"""
+	The best time per call in seconds, over `repeat` rounds of at least 0.2s each.
+	"""
+	timer = Timer(func)
+	number, _ = timer.autorange()
+	return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def measure_peak_memory(func):
+	"""
+	The peak memory in bytes that is allocated by Python while calling `func` once.
+	"""
+	tracemalloc.start()
+	try:
+		func()
+		return tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+
+def as_plain_text(txt):
+	if isinstance(txt, bytes):
+		codec = detect_compression(txt[:8])
+		if codec is not None:
+			txt = codec.decompress(txt)
+		txt = txt.decode('utf-8')
+	return txt
+
+
+def run_payload(payload, repeat):
+	data = payload.make()
+	result = {'name': payload.name}
+	if payload.text:
+		txt = data
+		plain_txt = strip_comments(txt)
+	else:
+		txt = dumps(data, **payload.dumps_kwargs)
+		plain_txt = as_plain_text(txt)
+		plain = json.loads(plain_txt)
+		result['dumps'] = measure_time(lambda: dumps(data, **payload.dumps_kwargs), repeat)
+		result['json_dumps'] = measure_time(lambda: json.dumps(plain), repeat)
+		result['dumps_peak'] = measure_peak_memory(lambda: dumps(data, **payload.dumps_kwargs))
+	result['loads'] = measure_time(lambda: loads(txt, **payload.loads_kwargs), repeat)
+	result['json_loads'] = measure_time(lambda: json.loads(plain_txt), repeat)
+	result['loads_peak'] = measure_peak_memory(lambda: loads(txt, **payload.loads_kwargs))
+	result['size'] = len(txt)
+	return result
+
+
+def format_row(result):
+	def time_cols(op):
+		if op not in result:
+			return ['-', '-']
+		return ['{0:.2f}'.format(1000 * result[op]), '{0:.1f}x'.format(result[op] / result['json_' + op])]
+	def memory_col(key):
+		if key not in result:
+			return '-'
+		return '{0:.1f}'.format(result[key] / 1e6)
+	return [result['name']] + time_cols('dumps') + time_cols('loads') + \
+		[memory_col('dumps_peak'), memory_col('loads_peak'), '{0:.0f}'.format(result['size'] / 1e3)]
+
+
+def print_table(results):
+	rows = [['payload', 'dumps ms', 'vs json', 'loads ms', 'vs json', 'dumps MB', 'loads MB', 'size kB']]
+	rows.extend(format_row(result) for result in results)
+	widths = [max(len(row[k]) for row in rows) for k in range(len(rows[0]))]
+	for row in rows:
+		print('  '.join(cell.ljust(width) if k == 0 else cell.rjust(width)
+			for k, (cell, width) in enumerate(zip(row, widths))))
+
+
+def compare(results, baseline_results, tolerance):
+	"""
+	Compare the time relative to the standard library with earlier results, and return the regressions.
+	"""
+	baseline = dict((result['name'], result) for result in baseline_results)
+	regressions = []
+	for result in results:
+		before = baseline.get(result['name'])
+		if before is None:
+			continue
+		for op in ('dumps', 'loads'):
+			if op not in result or op not in before:
+				continue
+			ratio = result[op] / result['json_' + op]
+			before_ratio = before[op] / before['json_' + op]
+			if ratio > tolerance * before_ratio:
+				regressions.append('{0:s} {1:s}: {2:.1f}x json, was {3:.1f}x'.format(
+					result['name'], op, ratio, before_ratio))
+	return regressions
+
+
+def main(argv=None):
+	parser = ArgumentParser(description='Benchmark json_tricks dumps and loads against the standard library json.')
+	parser.add_argument('--only', default=None, help='Comma-separated names of payloads to run.')
+	parser.add_argument('--repeat', type=int, default=5, help='Number of rounds to take the best time of.')
+	parser.add_argument('--save', default=None, help='Store the results as json in this file.')
+	parser.add_argument('--compare', default=None, help='Compare with results stored earlier using --save.')
+	parser.add_argument('--tolerance', type=float, default=1.25, help='Allowed slowdown factor for --compare.')
+	args = parser.parse_args(argv)
+	payloads = PAYLOADS
+	if args.only:
+		names = args.only.split(',')
+		payloads = [payload for payload in PAYLOADS if payload.name in names]
+	results = []
+	for payload in payloads:
+		missing = [mod for mod in payload.requires if not is_module_available(mod)]
+		if missing:
+			print('skipping {0:s} because {1:s} is not installed'.format(payload.name, ', '.join(missing)))
+			continue
+		results.append(run_payload(payload, repeat=args.repeat))
+	print_table(results)
+	if args.save:
+		with open(args.save, 'w') as fh:
+			json.dump(results, fh, indent=2)
+	if args.compare:
+		with open(args.compare, 'r') as fh:
+			regressions = compare(results, json.load(fh), args.tolerance)
+		for regression in regressions:
+			print('slower: {0:s}'.format(regression))
+		if regressions:
+			return 1
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
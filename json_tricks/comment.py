@@ -1,31 +1,89 @@
+from re import compile as re_compile, escape, DOTALL
 
-from re import findall
+
+DEFAULT_COMMENT_SYMBOLS = frozenset(('#', '//'))
+
+_code_patterns = {}
+
+
+def _get_code_pattern(comment_symbols):
+	"""
+	Get a regex that matches json code up to the next possible comment start, skipping over complete strings.
+
+	The string alternative is 'unrolled' so that it cannot backtrack much, even for unterminated strings.
+	"""
+	key = frozenset(comment_symbols)
+	if key not in _code_patterns:
+		starts = ''.join(sorted(set(escape(symbol[0]) for symbol in key)))
+		_code_patterns[key] = re_compile(r'(?:[^"{0:s}]+|"[^"\\]*(?:\\.[^"\\]*)*")*'.format(starts), DOTALL)
+	return _code_patterns[key]
+
+
+def _iter_comments(string, comment_symbols):
+	"""
+	Find the comments in a json string in one pass, yielding the start and end index of each.
+
+	Comments run until the end of the line, but do not include the newline.
+	"""
+	code = _get_code_pattern(comment_symbols)
+	symbols = tuple(comment_symbols)
+	pos, size = 0, len(string)
+	while pos < size:
+		pos = code.match(string, pos).end()
+		if pos >= size or string[pos] == '"':
+			# end of the input, or an unterminated string; the json parser will report the latter
+			return
+		if not string.startswith(symbols, pos):
+			# the first character of a comment symbol, but not a full one (like a single '/')
+			pos += 1
+			continue
+		end = string.find('\n', pos)
+		if end < 0:
+			end = size
+		elif string[end - 1] == '\r':
+			end -= 1
+		yield pos, end
+		pos = end
+
+
+def has_comments(string, comment_symbols=DEFAULT_COMMENT_SYMBOLS):
+	"""
+	Check whether a json string contains any comments, without parsing it. Comment symbols inside strings are ignored.
+
+	:param string: A string containing json that may have comments started by comment_symbols.
+	:param comment_symbols: Iterable of symbols that start a line comment (default # or //).
+	:return: True if there is at least one comment.
+	"""
+	if not any(symbol in string for symbol in comment_symbols):
+		return False
+	if '\\"' not in string:
+		# without escaped quotes, every other part between quotes is outside of strings
+		code = '"'.join(string.split('"')[::2])
+		return any(symbol in code for symbol in comment_symbols)
+	for _ in _iter_comments(string, comment_symbols):
+		return True
+	return False
 
 
 def strip_comment_line_with_symbol(line, start):
-	parts = line.split(start)
-	counts = [len(findall(r'(?:^|[^"\\]|(?:\\\\|\\")+)(")(?!")', part)) for part in parts]
-	total = 0
-	for nr, count in enumerate(counts):
-		total += count
-		if total % 2 == 0:
-			return start.join(parts[:nr+1]).rstrip()
-	else:
-		return line.rstrip()
+	return strip_comments(line, comment_symbols=(start,)).rstrip()
 
 
-def strip_comments(string, comment_symbols=frozenset(('#', '//'))):
+def strip_comments(string, comment_symbols=DEFAULT_COMMENT_SYMBOLS):
 	"""
-	Stripping comments usually works, but there are a few edge cases that trip it up, like https://github.com/mverleg/pyjson_tricks/issues/57.
+	Remove line comments from json, in a single pass that skips over strings (including escaped quotes).
+	Whitespace before a comment is removed along with it.
 
 	:param string: A string containing json with comments started by comment_symbols.
 	:param comment_symbols: Iterable of symbols that start a line comment (default # or //).
 	:return: The string with the comments removed.
 	"""
-	lines = string.splitlines()
-	for k in range(len(lines)):
-		for symbol in comment_symbols:
-			lines[k] = strip_comment_line_with_symbol(lines[k], start=symbol)
-	return '\n'.join(lines)
-
-
+	if not any(symbol in string for symbol in comment_symbols):
+		return string
+	parts = []
+	prev = 0
+	for start, end in _iter_comments(string, comment_symbols):
+		parts.append(string[prev:start].rstrip(' \t'))
+		prev = end
+	parts.append(string[prev:])
+	return ''.join(parts)
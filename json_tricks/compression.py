@@ -0,0 +1,294 @@
+"""
+Compression formats for whole json documents and for compact numpy arrays.
+
+Built-in are gzip (default), zlib, bz2 and lzma. Zstandard and LZ4 are available if `zstandard` (or Python 3.14+)
+and `lz4` are installed, respectively. Other formats can be added with `register_compression`.
+"""
+
+import zlib
+from collections import OrderedDict
+from importlib import import_module
+from gzip import GzipFile
+
+from .utils import gzip_compress, gzip_decompress, is_module_available
+
+
+DECOMPRESS_CHUNK_SIZE = 65536
+
+
+class CompressionCodec(object):
+	"""
+	A compression format that can be used for json documents and compact numpy arrays.
+	"""
+	def __init__(self, name, compressor, decompressor, magic=None, default_level=None, tag=None):
+		"""
+		:param name: The name to select this format, e.g. `dumps(data, compression='lzma')`.
+		:param compressor: Function that takes a compression level (or None), and returns an object with
+			`compress(data)` and `flush()` methods, like `zlib.compressobj`.
+		:param decompressor: Function without arguments that returns an object like `bz2.BZ2Decompressor`,
+			i.e. with `decompress(data, max_length)`, `eof`, `needs_input` and `unused_data`.
+		:param magic: The bytes at the start of compressed data, or a function that takes the first bytes
+			and returns whether they match. Used to recognize the format when loading.
+		:param default_level: The level to use if none is given.
+		:param tag: The name used in the header of compact numpy arrays (defaults to `name`).
+		"""
+		self.name = name
+		self.compressor = compressor
+		self.decompressor = decompressor
+		self.magic = magic
+		self.default_level = default_level
+		self.tag = tag or name
+
+	def __repr__(self):
+		return '{0:s}({1:s})'.format(self.__class__.__name__, self.name)
+
+	def matches(self, head):
+		if self.magic is None:
+			return False
+		if callable(self.magic):
+			return self.magic(head)
+		return head[:len(self.magic)] == self.magic
+
+	def compress(self, data, level=None):
+		compressor = self.compressor(self.default_level if level is None else level)
+		return compressor.compress(data) + compressor.flush()
+
+	def decompress(self, data):
+		return b''.join(self.iter_decompress([data]))
+
+	def writer(self, fileobj, level=None):
+		"""
+		Get a file-like object that compresses everything written to it into `fileobj`. Closing it
+		finishes the compressed data, but does not close `fileobj`.
+		"""
+		return _CompressingWriter(fileobj, self.compressor(self.default_level if level is None else level))
+
+	def iter_decompress(self, chunks, chunk_size=DECOMPRESS_CHUNK_SIZE):
+		"""
+		Incrementally decompress an iterable of bytes, yielding pieces of at most `chunk_size` bytes.
+		Concatenated compressed streams (e.g. from appending to a file) are decompressed one after another.
+		"""
+		decompressor = self.decompressor()
+		started = False
+		for chunk in chunks:
+			while chunk or not decompressor.needs_input:
+				started = started or bool(chunk)
+				data = decompressor.decompress(chunk, chunk_size)
+				chunk = b''
+				if data:
+					yield data
+				if decompressor.eof:
+					chunk = decompressor.unused_data
+					decompressor = self.decompressor()
+					started = False
+		if started:
+			raise EOFError('Compressed data ({0:s}) ended before the end-of-stream marker was reached'.format(self.name))
+
+
+class _GzipCodec(CompressionCodec):
+	"""
+	Gzip uses `GzipFile`, which gives the same output as earlier versions of json_tricks.
+	"""
+	def compress(self, data, level=None):
+		return gzip_compress(data, compresslevel=self.default_level if level is None else level)
+
+	def decompress(self, data):
+		return gzip_decompress(data)
+
+	def writer(self, fileobj, level=None):
+		return GzipFile(filename='', fileobj=fileobj, mode='wb', mtime=0,
+			compresslevel=self.default_level if level is None else level)
+
+
+class _CompressingWriter(object):
+	def __init__(self, fileobj, compressor):
+		self.fileobj = fileobj
+		self.compressor = compressor
+
+	def write(self, data):
+		compressed = self.compressor.compress(data)
+		if compressed:
+			self.fileobj.write(compressed)
+		return len(data)
+
+	def close(self):
+		if self.compressor is not None:
+			self.fileobj.write(self.compressor.flush())
+			self.compressor = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+
+class _ZlibDecompressor(object):
+	"""
+	Wraps `zlib.decompressobj` to work like `bz2.BZ2Decompressor`.
+	"""
+	def __init__(self, wbits):
+		self._decompressobj = zlib.decompressobj(wbits)
+		self.needs_input = True
+
+	def decompress(self, data, max_length=-1):
+		tail = self._decompressobj.unconsumed_tail
+		if tail:
+			data = tail + data
+		data = self._decompressobj.decompress(data, max(max_length, 0))
+		self.needs_input = not self._decompressobj.unconsumed_tail and (max_length <= 0 or len(data) < max_length)
+		return data
+
+	@property
+	def eof(self):
+		return self._decompressobj.eof
+
+	@property
+	def unused_data(self):
+		return self._decompressobj.unused_data
+
+
+class _UnlimitedDecompressor(object):
+	"""
+	Wraps decompressors that do not support `max_length` to work like `bz2.BZ2Decompressor`.
+	"""
+	needs_input = True
+
+	def __init__(self, decompressobj):
+		self._decompressobj = decompressobj
+
+	def decompress(self, data, max_length=-1):
+		return self._decompressobj.decompress(data)
+
+	@property
+	def eof(self):
+		return self._decompressobj.eof
+
+	@property
+	def unused_data(self):
+		return self._decompressobj.unused_data
+
+
+class _Lz4Compressor(object):
+	"""
+	Wraps `lz4.frame.LZ4FrameCompressor` to work like `zlib.compressobj`.
+	"""
+	def __init__(self, level):
+		from lz4.frame import LZ4FrameCompressor
+		self._compressor = LZ4FrameCompressor(compression_level=level)
+		self._header = self._compressor.begin()
+
+	def compress(self, data):
+		data = self._header + self._compressor.compress(data)
+		self._header = b''
+		return data
+
+	def flush(self):
+		data = self._header + self._compressor.flush()
+		self._header = b''
+		return data
+
+
+def _is_zlib_header(head):
+	# zlib.compress always uses a 32k window, so the first byte is 'x', which cannot start a json document
+	if len(head) < 2:
+		return False
+	first, second = bytearray(head[:2])
+	return first == 0x78 and (first * 256 + second) % 31 == 0
+
+
+COMPRESSION_CODECS = OrderedDict()
+
+
+def register_compression(codec):
+	"""
+	Add a `CompressionCodec`, so that it can be selected by name and recognized when loading.
+	"""
+	COMPRESSION_CODECS[codec.name] = codec
+	return codec
+
+
+def get_compression(name):
+	"""
+	Get a registered `CompressionCodec` by its name or numpy array header tag.
+	"""
+	if name in COMPRESSION_CODECS:
+		return COMPRESSION_CODECS[name]
+	for codec in COMPRESSION_CODECS.values():
+		if codec.tag == name:
+			return codec
+	raise ValueError(('unknown compression "{0:}"; available are: {1:s} (some formats need optional packages, '
+		'like zstandard or lz4)').format(name, ', '.join(COMPRESSION_CODECS)))
+
+
+def detect_compression(head):
+	"""
+	Find the `CompressionCodec` of data starting with bytes `head`, or None if it does not seem compressed.
+	"""
+	if not isinstance(head, bytes):
+		return None
+	for codec in COMPRESSION_CODECS.values():
+		if codec.matches(head):
+			return codec
+	return None
+
+
+def resolve_compression(compression):
+	"""
+	Get the codec and level for a `compression` argument: True (gzip with level 5), an integer (the gzip level),
+	a format name, or a tuple of format name and level. Returns (None, None) for no compression.
+	"""
+	if not compression:
+		return None, None
+	if compression is True:
+		return COMPRESSION_CODECS['gzip'], None
+	if isinstance(compression, int):
+		return COMPRESSION_CODECS['gzip'], compression
+	if isinstance(compression, CompressionCodec):
+		return compression, None
+	if isinstance(compression, tuple):
+		name, level = compression
+		codec = name if isinstance(name, CompressionCodec) else get_compression(name)
+		return codec, level
+	return get_compression(compression), None
+
+
+register_compression(_GzipCodec('gzip', tag='gz', magic=b'\x1f\x8b', default_level=5,
+	compressor=lambda level: zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS),
+	decompressor=lambda: _ZlibDecompressor(16 + zlib.MAX_WBITS)))
+register_compression(CompressionCodec('zlib', magic=_is_zlib_header, default_level=6,
+	compressor=lambda level: zlib.compressobj(level),
+	decompressor=lambda: _ZlibDecompressor(zlib.MAX_WBITS)))
+
+try:
+	import bz2
+except ImportError:
+	pass
+else:
+	register_compression(CompressionCodec('bz2', magic=b'BZh', default_level=9,
+		compressor=lambda level: bz2.BZ2Compressor(level),
+		decompressor=bz2.BZ2Decompressor))
+
+try:
+	import lzma
+except ImportError:
+	pass
+else:
+	register_compression(CompressionCodec('lzma', tag='xz', magic=b'\xfd7zXZ\x00', default_level=6,
+		compressor=lambda level: lzma.LZMACompressor(preset=level),
+		decompressor=lzma.LZMADecompressor))
+
+# zstd and lz4 are only imported when used, since they are optional and importing them takes time
+if is_module_available('compression.zstd'):
+	register_compression(CompressionCodec('zstd', magic=b'\x28\xb5\x2f\xfd', default_level=3,
+		compressor=lambda level: import_module('compression.zstd').ZstdCompressor(level=level),
+		decompressor=lambda: import_module('compression.zstd').ZstdDecompressor()))
+elif is_module_available('zstandard'):
+	register_compression(CompressionCodec('zstd', magic=b'\x28\xb5\x2f\xfd', default_level=3,
+		compressor=lambda level: import_module('zstandard').ZstdCompressor(level=level).compressobj(),
+		decompressor=lambda: _UnlimitedDecompressor(import_module('zstandard').ZstdDecompressor().decompressobj())))
+
+if is_module_available('lz4'):
+	register_compression(CompressionCodec('lz4', magic=b'\x04\x22\x4d\x18', default_level=0,
+		compressor=_Lz4Compressor,
+		decompressor=lambda: import_module('lz4.frame').LZ4FrameDecompressor()))
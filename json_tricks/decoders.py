@@ -1,13 +1,23 @@
 import sys
 import warnings
 from base64 import standard_b64decode
+from binascii import a2b_base64
+from bisect import bisect_right
 from collections import OrderedDict
-from datetime import datetime, date, time, timedelta
+from copy import copy
+from datetime import datetime, date, time, timedelta, timezone
 from decimal import Decimal
 from fractions import Fraction
+from functools import lru_cache
+from itertools import chain
+from os.path import basename, exists, join
 
 from json_tricks import NoEnumException, NoPandasException, NoNumpyException
-from .utils import ClassInstanceHookBase, nested_index, str_type, gzip_decompress, filtered_wrapper
+from .utils import ClassInstanceHookBase, str_type, filtered_wrapper, decodes_keys
+from .compression import get_compression
+
+
+B64_CHUNK_SIZE = 65536
 
 
 class DuplicateJsonKeyException(Exception):
@@ -23,15 +33,35 @@ class TricksPairHook(object):
 		"""
 		:param ordered: True if maps should retain their ordering.
 		:param obj_pairs_hooks: An iterable of hooks to apply to elements.
+		:param properties: Passed to the hooks. If it contains a `TricksStats` under 'stats', the calls are recorded there.
+
+		Hooks can also accept `references`, a map of the objects stored with `__ref__` markers in the current document.
 		"""
 		self.properties = properties or {}
 		self.map_type = OrderedDict
 		if not ordered:
 			self.map_type = dict
 		self.obj_pairs_hooks = []
+		self._hook_keys = {}
+		keyless_hooks = []
 		if obj_pairs_hooks:
-			self.obj_pairs_hooks = list(filtered_wrapper(hook) for hook in obj_pairs_hooks)
+			obj_pairs_hooks = list(obj_pairs_hooks)
+			self.obj_pairs_hooks = list(filtered_wrapper(hook, ('properties', 'references')) for hook in obj_pairs_hooks)
+			stats = self.properties.get('stats', None)
+			if stats is not None:
+				self.obj_pairs_hooks = [stats.wrap_hook(hook, wrapped)
+					for hook, wrapped in zip(obj_pairs_hooks, self.obj_pairs_hooks)]
+			for index, hook in enumerate(obj_pairs_hooks):
+				keys = getattr(hook, 'decodes_keys', None)
+				if keys is None:
+					keyless_hooks.append(index)
+					continue
+				for key in keys:
+					self._hook_keys.setdefault(key, []).append(index)
+		self._keyless_hooks = tuple(keyless_hooks)
+		self._marker_keys = frozenset(self._hook_keys)
 		self.allow_duplicates = allow_duplicates
+		self.references = {}
 
 	def __call__(self, pairs):
 		if not self.allow_duplicates:
@@ -42,11 +72,71 @@ class TricksPairHook(object):
 						'duplicate key "{0:}" (but allow_duplicates is False)').format(key))
 				known.add(key)
 		map = self.map_type(pairs)
-		for hook in self.obj_pairs_hooks:
-			map = hook(map, properties=self.properties)
+		indices = self._get_map_hooks(map)
+		pos = 0
+		while pos < len(indices):
+			index = indices[pos]
+			result = self.obj_pairs_hooks[index](map, properties=self.properties, references=self.references)
+			pos += 1
+			if result is not map:
+				# the map was converted, so continue with the hooks that apply to the new object
+				indices = self._get_map_hooks(result) if isinstance(result, dict) else self._keyless_hooks
+				pos = bisect_right(indices, index)
+				map = result
 		return map
 
+	def new_document(self):
+		"""
+		Get a copy of this hook to load one document with, which has its own (empty) map of references.
+		"""
+		hook = copy(self)
+		hook.references = {}
+		return hook
+
+	def _get_map_hooks(self, map):
+		"""
+		Get the (ordered) indices of the hooks that apply to this map, based on the marker keys declared with `decodes_keys`.
+		"""
+		markers = self._marker_keys.intersection(map)
+		if not markers:
+			return self._keyless_hooks
+		indices = set(self._keyless_hooks)
+		for key in markers:
+			indices.update(self._hook_keys[key])
+		return sorted(indices)
+
+
+_TIMEZONE_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=_TIMEZONE_CACHE_SIZE)
+def get_timezone(name):
+	"""
+	Get the timezone for a name, using `pytz` or, if that is not installed, `zoneinfo`. The most recently used
+	timezones are cached, so that they are looked up only once per name, even for many date/times.
+	Use `get_timezone.cache_clear()` to forget them.
+	"""
+	try:
+		import pytz
+	except ImportError as pytz_err:
+		try:
+			from zoneinfo import ZoneInfo
+		except ImportError:
+			raise ImportError(('Tried to load a json object which has a timezone-aware (date)time. '
+				'However, `pytz` could not be imported, so the object could not be loaded. '
+				'Error: {0:}').format(str(pytz_err)))
+		return ZoneInfo(name)
+	return pytz.timezone(name)
+
+
+def _localize(tzinfo, dt, is_dst):
+	if hasattr(tzinfo, 'localize'):
+		return tzinfo.localize(dt, is_dst=is_dst)
+	# zoneinfo: the dst time comes first when the clock is set back, which is fold 0
+	return dt.replace(tzinfo=tzinfo, fold=0 if is_dst is None or is_dst else 1)
+
 
+@decodes_keys('__date__', '__time__', '__datetime__', '__timedelta__')
 def json_date_time_hook(dct):
 	"""
 	Return an encoded date, time, datetime or timedelta to it's python representation, including optional timezone.
@@ -54,39 +144,112 @@ def json_date_time_hook(dct):
 	:param dct: (dict) json encoded date, time, datetime or timedelta
 	:return: (date/time/datetime/timedelta obj) python representation of the above
 	"""
-	def get_tz(dct):
-		if not 'tzinfo' in dct:
-			return None
-		try:
-			import pytz
-		except ImportError as err:
-			raise ImportError(('Tried to load a json object which has a timezone-aware (date)time. '
-				'However, `pytz` could not be imported, so the object could not be loaded. '
-				'Error: {0:}').format(str(err)))
-		return pytz.timezone(dct['tzinfo'])
-
 	if not isinstance(dct, dict):
 		return dct
+	tzinfo = get_timezone(dct['tzinfo']) if 'tzinfo' in dct else None
+	for key in ('__datetime__', '__date__', '__time__', '__timedelta__'):
+		if dct.get(key) is not None:
+			return _json_date_time_compact(key, dct[key], tzinfo, dct.get('is_dst', None))
 	if '__date__' in dct:
 		return date(year=dct.get('year', 0), month=dct.get('month', 0), day=dct.get('day', 0))
 	elif '__time__' in dct:
-		tzinfo = get_tz(dct)
 		return time(hour=dct.get('hour', 0), minute=dct.get('minute', 0), second=dct.get('second', 0),
 			microsecond=dct.get('microsecond', 0), tzinfo=tzinfo)
 	elif '__datetime__' in dct:
-		tzinfo = get_tz(dct)
 		dt = datetime(year=dct.get('year', 0), month=dct.get('month', 0), day=dct.get('day', 0),
 			hour=dct.get('hour', 0), minute=dct.get('minute', 0), second=dct.get('second', 0),
 			microsecond=dct.get('microsecond', 0))
 		if tzinfo is None:
 			return dt
-		return tzinfo.localize(dt, is_dst=dct.get('is_dst', None))
+		return _localize(tzinfo, dt, dct.get('is_dst', None))
 	elif '__timedelta__' in dct:
 		return timedelta(days=dct.get('days', 0), seconds=dct.get('seconds', 0),
 			microseconds=dct.get('microseconds', 0))
 	return dct
 
 
+def _json_date_time_compact(key, value, tzinfo, is_dst):
+	"""
+	Parse the compact form of dates and times, which is stored as iso string (or microseconds for timedelta).
+	"""
+	if key == '__datetime__':
+		dt = datetime.fromisoformat(value)
+		if tzinfo is None:
+			return dt
+		if dt.tzinfo is None:
+			return _localize(tzinfo, dt, is_dst)
+		return dt.astimezone(tzinfo)
+	if key == '__date__':
+		return date.fromisoformat(value)
+	if key == '__time__':
+		tm = time.fromisoformat(value)
+		if tzinfo is None:
+			return tm
+		return tm.replace(tzinfo=tzinfo)
+	return timedelta(microseconds=value)
+
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+@decodes_keys('__datetime_array__', '__decimal_array__')
+def json_packed_list_hook(dct):
+	"""
+	Restore a list of datetimes or Decimals that was packed by the `pack_lists` property of `TricksEncoder`.
+	"""
+	if not isinstance(dct, dict):
+		return dct
+	if '__datetime_array__' in dct:
+		values = dct['__datetime_array__']
+		if 'tzinfo' not in dct:
+			return [_EPOCH + timedelta(microseconds=value) for value in values]
+		tzinfo = get_timezone(dct['tzinfo'])
+		return [(_EPOCH_UTC + timedelta(microseconds=value)).astimezone(tzinfo) for value in values]
+	if '__decimal_array__' in dct:
+		return [Decimal(value) for value in dct['__decimal_array__']]
+	return dct
+
+
+@decodes_keys('__ref__')
+def json_reference_hook(dct, properties=None, references=None):
+	"""
+	Restore objects that were stored once with property `references`. They are `{"__ref__": n, "value": ...}`
+	the first time (the value is already decoded), and `{"__ref__": n}` after that.
+
+	Arrays that were equal but not the same (property `ndarray_dedup`) have `"equal": true`, and become read-only
+	views of the first array, or copies if property `ndarray_dedup_copy` is set.
+
+	References are only resolved if property `references` or `ndarray_dedup` is also passed when loading, so that
+	other maps with a `__ref__` key are left unchanged.
+	"""
+	if not isinstance(dct, dict) or '__ref__' not in dct or references is None:
+		return dct
+	properties = properties or {}
+	if not (properties.get('references', False) or properties.get('ndarray_dedup', False)
+			or properties.get('ndarray_dedup_copy', False)):
+		return dct
+	if type(dct['__ref__']) is not int or not (len(dct) == 1 or (len(dct) == 2 and
+			('value' in dct or dct.get('equal', None) is True))):
+		return dct
+	if 'value' in dct:
+		references[dct['__ref__']] = dct['value']
+		return dct['value']
+	try:
+		value = references[dct['__ref__']]
+	except KeyError:
+		raise ValueError(('Found a reference to object {0:} before that object was complete; this happens for '
+			'circular references, or for json that was changed after it was encoded').format(dct['__ref__']))
+	ndarray = getattr(sys.modules.get('numpy'), 'ndarray', None)
+	if dct.get('equal', False) and ndarray is not None and isinstance(value, ndarray):
+		if properties.get('ndarray_dedup_copy', False):
+			return value.copy()
+		value = value.view()
+		value.flags.writeable = False
+	return value
+
+
+@decodes_keys('__complex__')
 def json_complex_hook(dct):
 	"""
 	Return an encoded complex number to Python complex type.
@@ -103,6 +266,7 @@ def json_complex_hook(dct):
 	return parts[0] + parts[1] * 1j
 
 
+@decodes_keys('__bytes_b64__', '__bytes_utf8__')
 def json_bytes_hook(dct):
 	"""
 	Return encoded bytes, either base64 or utf8, back to Python bytes.
@@ -119,6 +283,7 @@ def json_bytes_hook(dct):
 	return dct
 
 
+@decodes_keys('__decimal__', '__fraction__')
 def numeric_types_hook(dct):
 	if not isinstance(dct, dict):
 		return dct
@@ -129,6 +294,7 @@ def numeric_types_hook(dct):
 	return dct
 
 
+@decodes_keys('__enum__')
 def noenum_hook(dct):
 	if isinstance(dct, dict) and '__enum__' in dct:
 		raise NoEnumException(('Trying to decode a map which appears to represent a enum '
@@ -136,6 +302,7 @@ def noenum_hook(dct):
 	return dct
 
 
+@decodes_keys('__pathlib__')
 def pathlib_hook(dct):
 	if not isinstance(dct, dict):
 		return dct
@@ -145,6 +312,7 @@ def pathlib_hook(dct):
 	return Path(dct['__pathlib__'])
 
 
+@decodes_keys('__pathlib__')
 def nopathlib_hook(dct):
 	if isinstance(dct, dict) and '__pathlib__' in dct:
 		raise NoPathlib(('Trying to decode a map which appears to represent a '
@@ -152,6 +320,7 @@ def nopathlib_hook(dct):
 						'is not enabled.'))
 	return dct
 
+@decodes_keys('__slice__')
 def slice_hook(dct):
 	if not isinstance(dct, dict):
 		return dct
@@ -160,6 +329,7 @@ def slice_hook(dct):
 	return slice(dct['start'], dct['stop'], dct['step'])
 
 
+@decodes_keys('__enum__')
 class EnumInstanceHook(ClassInstanceHookBase):
 	"""
 	This hook tries to convert json encoded by enum_instance_encode back to it's original instance.
@@ -176,6 +346,7 @@ class EnumInstanceHook(ClassInstanceHookBase):
 		return Cls[dct['__enum__']['name']]
 
 
+@decodes_keys('__instance_type__')
 class ClassInstanceHook(ClassInstanceHookBase):
 	"""
 	This hook tries to convert json encoded by class_instance_encoder back to it's original instance.
@@ -210,6 +381,7 @@ class ClassInstanceHook(ClassInstanceHookBase):
 		return obj
 
 
+@decodes_keys('__set__')
 def json_set_hook(dct):
 	"""
 	Return an encoded set to it's python representation.
@@ -221,55 +393,118 @@ def json_set_hook(dct):
 	return set((tuple(item) if isinstance(item, list) else item) for item in dct['__set__'])
 
 
+@decodes_keys('__pandas_dataframe__', '__pandas_series__', '__pandas_array__')
 def pandas_hook(dct):
+	"""
+	Replace maps encoded by `pandas_encode` by a `DataFrame` or `Series`.
+
+	Columns that were stored as numpy arrays (see property `pandas_columnar`) are used without copying.
+	"""
 	if not isinstance(dct, dict):
 		return dct
-	if '__pandas_dataframe__' not in dct and '__pandas_series__' not in dct:
+	if '__pandas_dataframe__' not in dct and '__pandas_series__' not in dct and '__pandas_array__' not in dct:
 		return dct
+	try:
+		from pandas.api.types import pandas_dtype
+	except ImportError:
+		raise NoPandasException('Trying to decode a map which appears to repr esent a pandas data structure, but pandas appears not to be installed.')
 	if '__pandas_dataframe__' in dct:
-		try:
-			from pandas import DataFrame
-		except ImportError:
-			raise NoPandasException('Trying to decode a map which appears to repr esent a pandas data structure, but pandas appears not to be installed.')
-		from numpy import dtype, array
+		from pandas import DataFrame
 		meta = dct.pop('__pandas_dataframe__')
-		indx = dct.pop('index') if 'index' in dct else None
-		dtypes = dict((colname, dtype(tp)) for colname, tp in zip(meta['column_order'], meta['types']))
+		indx = _pandas_index(dct.pop('index')) if 'index' in dct else None
+		dtypes = dict((colname, pandas_dtype(tp)) for colname, tp in zip(meta['column_order'], meta['types']))
 		data = OrderedDict()
 		for name, col in dct.items():
-			data[name] = array(col, dtype=dtypes[name])
+			data[name] = _pandas_column(col, dtypes[name])
 		return DataFrame(
 			data=data,
 			index=indx,
 			columns=meta['column_order'],
 			# mixed `dtypes` argument not supported, so use duct of numpy arrays
+			copy=False,
 		)
 	elif '__pandas_series__' in dct:
 		from pandas import Series
-		from numpy import dtype, array
 		meta = dct.pop('__pandas_series__')
-		indx = dct.pop('index') if 'index' in dct else None
+		indx = _pandas_index(dct.pop('index')) if 'index' in dct else None
 		return Series(
-			data=dct['data'],
+			data=_pandas_column(dct['data'], pandas_dtype(meta['type'])),
 			index=indx,
 			name=meta['name'],
-			dtype=dtype(meta['type']),
+			copy=False,
 		)
-	return dct	# impossible
+	return _pandas_extension_array(dct)
+
+
+def _pandas_extension_array(dct):
+	"""
+	Decode the extension arrays encoded by `_pandas_extension_values`.
+	"""
+	from numpy import asarray
+	from pandas import Categorical, DatetimeIndex, array as pd_array
+	from pandas.api.types import pandas_dtype
+	kind = dct['__pandas_array__']
+	if kind == 'category':
+		return Categorical.from_codes(asarray(dct['codes']), categories=dct['categories'], ordered=dct['ordered'])
+	if kind == 'datetime':
+		epoch = asarray(dct['values'], dtype='int64').view('datetime64[{0:s}]'.format(dct['unit']))
+		if dct.get('tz', None) is None:
+			return epoch
+		return DatetimeIndex(epoch).tz_localize('UTC').tz_convert(dct['tz']).array
+	if kind == 'timedelta':
+		return asarray(dct['values'], dtype='int64').view('timedelta64[{0:s}]'.format(dct['unit']))
+	if kind == 'masked':
+		dtype = pandas_dtype(dct['dtype'])
+		return dtype.construct_array_type()(asarray(dct['values'], dtype=dtype.numpy_dtype),
+			asarray(dct['mask'], dtype=bool))
+	if kind == 'string':
+		return pd_array(dct['values'], dtype=dct['dtype'])
+	raise ValueError('unknown pandas array type "{0:}"'.format(kind))
+
+
+def _pandas_column(col, col_type):
+	"""
+	Convert a decoded column to an array of the given type, without copying if it was already such an array.
+	"""
+	from numpy import array, asarray, ndarray, dtype
+	if not isinstance(col_type, dtype):
+		if isinstance(col, (list, ndarray)):
+			from pandas import array as pd_array
+			return pd_array(col, dtype=col_type)
+		return col
+	if isinstance(col, ndarray):
+		return asarray(col, dtype=col_type)
+	return array(col, dtype=col_type)
+
+
+def _pandas_index(indx):
+	"""
+	Arrays are wrapped in an `Index` directly, so that pandas does not iterate over them.
+	"""
+	if isinstance(indx, list):
+		return indx
+	from pandas import Index
+	return Index(indx, copy=False)
 
 
+@decodes_keys('__pandas_dataframe__', '__pandas_series__', '__pandas_array__')
 def nopandas_hook(dct):
-	if isinstance(dct, dict) and ('__pandas_dataframe__' in dct or '__pandas_series__' in dct):
+	if isinstance(dct, dict) and ('__pandas_dataframe__' in dct or '__pandas_series__' in dct or '__pandas_array__' in dct):
 		raise NoPandasException(('Trying to decode a map which appears to represent a pandas '
 			'data structure, but pandas support is not enabled, perhaps it is not installed.'))
 	return dct
 
 
-def json_numpy_obj_hook(dct):
+@decodes_keys('__ndarray__')
+def json_numpy_obj_hook(dct, properties=None):
 	"""
 	Replace any numpy arrays previously encoded by `numpy_encode` to their proper
 	shape, data type and data.
 
+	Arrays stored in separate `.npy` files are looked up in the directory from property `ndarray_sidecar` (relative
+	to the working directory, not to the json file), and are memory-mapped using property `ndarray_mmap_mode`
+	(default 'r' for read-only; None to load into memory).
+
 	:param dct: (dict) json encoded ndarray
 	:return: (ndarray) if input was an encoded ndarray
 	"""
@@ -291,6 +526,8 @@ def json_numpy_obj_hook(dct):
 	if shape:
 		if nptype == 'object':
 			return _lists_of_obj_to_ndarray(data_json, order, shape, nptype)
+		if isinstance(data_json, str_type) and data_json.startswith('npy:'):
+			return _sidecar_to_ndarray(data_json[4:], shape, properties or {})
 		if isinstance(data_json, str_type):
 			endianness = dct.get('endian', 'native')
 			return _bin_str_to_ndarray(data_json, order, shape, nptype, endianness)
@@ -302,20 +539,22 @@ def json_numpy_obj_hook(dct):
 
 def _bin_str_to_ndarray(data, order, shape, np_type_name, data_endianness):
 	"""
-	From base64 encoded, gzipped binary data to ndarray.
+	From base64 encoded, compressed binary data to ndarray.
+
+	The data is decoded (and decompressed) in chunks, directly into the memory of the new array.
 	"""
-	from base64 import standard_b64decode
-	from numpy import frombuffer, dtype
+	from numpy import empty, dtype, frombuffer, uint8
 
 	assert order in [None, 'C'], 'specifying different memory order is not (yet) supported ' \
 								 'for binary numpy format (got order = {})'.format(order)
-	if data.startswith('b64.gz:'):
-		data = standard_b64decode(data[7:])
-		data = gzip_decompress(data)
-	elif data.startswith('b64:'):
-		data = standard_b64decode(data[4:])
+	if data.startswith('b64:'):
+		start = 4
+		codec = None
+	elif data.startswith('b64.') and ':' in data[:32]:
+		start = data.index(':') + 1
+		codec = get_compression(data[4:start - 1])
 	else:
-		raise ValueError('found numpy array buffer, but did not understand header; supported: b64 or b64.gz')
+		raise ValueError('found numpy array buffer, but did not understand header; supported: b64 or b64.<compression>, like b64.gz')
 	np_type = dtype(np_type_name)
 	if data_endianness == sys.byteorder:
 		pass
@@ -325,8 +564,46 @@ def _bin_str_to_ndarray(data, order, shape, np_type_name, data_endianness):
 		np_type = np_type.newbyteorder('>')
 	elif data_endianness != 'native':
 		warnings.warn('array of shape {} has unknown endianness \'{}\''.format(shape, data_endianness))
-	data = frombuffer(bytearray(data), dtype=np_type)
-	return data.reshape(shape)
+	arr = empty(shape, dtype=np_type)
+	target = arr.reshape(-1).view(uint8)
+	pos = 0
+	chunks = _iter_b64_decode(data, start)
+	if codec is not None:
+		chunks = codec.iter_decompress(chunks, B64_CHUNK_SIZE)
+	for chunk in chunks:
+		end = pos + len(chunk)
+		if end > len(target):
+			raise ValueError('numpy array buffer contains more data than expected for shape {} and type {}'.format(shape, np_type))
+		target[pos:end] = frombuffer(chunk, dtype=uint8)
+		pos = end
+	if pos != len(target):
+		raise ValueError('numpy array buffer contains less data than expected for shape {} and type {}'.format(shape, np_type))
+	return arr
+
+
+def _iter_b64_decode(data, start, chunk_size=B64_CHUNK_SIZE):
+	"""
+	Decode base64 text from position `start` in chunks.
+	"""
+	for begin in range(start, len(data), chunk_size):
+		yield a2b_base64(data[begin:begin + chunk_size])
+
+
+def _sidecar_to_ndarray(name, shape, properties):
+	"""
+	From a separate .npy file to (memory-mapped) ndarray.
+	"""
+	from numpy import load
+	if basename(name) != name:
+		raise ValueError('numpy array file "{0:s}" should be a file name without directory'.format(name))
+	path = join(properties.get('ndarray_sidecar', None) or '', name)
+	if not exists(path):
+		raise IOError(('could not find file "{0:s}" for a numpy array that was stored outside the json; pass '
+			'the directory that contains it as `properties={{"ndarray_sidecar": directory}}`').format(path))
+	arr = load(path, mmap_mode=properties.get('ndarray_mmap_mode', 'r'), allow_pickle=False)
+	if shape != arr.shape:
+		warnings.warn('size mismatch decoding numpy array: expected {}, got {}'.format(shape, arr.shape))
+	return arr
 
 
 def _lists_of_numbers_to_ndarray(data, order, shape, dtype):
@@ -345,15 +622,42 @@ def _lists_of_numbers_to_ndarray(data, order, shape, dtype):
 def _lists_of_obj_to_ndarray(data, order, shape, dtype):
 	"""
 	From nested list of objects (that aren't native numpy numbers) to ndarray.
+
+	The lists are flattened (only as deep as the shape), so that the array can be filled at once.
 	"""
-	from numpy import empty, ndindex
-	arr = empty(shape, dtype=dtype, order=order)
-	dec_data = data
-	for indx in ndindex(arr.shape):
-		arr[indx] = nested_index(dec_data, indx)
+	from numpy import empty, fromiter
+	flat = _flatten_lists(data, shape)
+	if flat is None:
+		raise ValueError('numpy object array data does not have the expected shape {0:}'.format(tuple(shape)))
+	try:
+		arr = fromiter(flat, dtype=dtype, count=len(flat))
+	except (TypeError, ValueError):
+		# older numpy cannot use fromiter for objects
+		arr = empty(len(flat), dtype=dtype)
+		for k, value in enumerate(flat):
+			arr[k] = value
+	arr = arr.reshape(shape)
+	if order == 'F':
+		arr = arr.copy(order='F')
 	return arr
 
 
+def _flatten_lists(data, shape):
+	"""
+	Flatten the first `len(shape)` levels of nested lists, or return None if they do not have that shape.
+	"""
+	if type(data) is not list or len(data) != shape[0]:
+		return None
+	flat = data
+	for size in shape[1:]:
+		if not flat:
+			return flat
+		if not set(map(type, flat)) <= {list} or set(map(len, flat)) != {size}:
+			return None
+		flat = list(chain.from_iterable(flat))
+	return flat
+
+
 def _scalar_to_numpy(data, dtype):
 	"""
 	From scalar value to numpy type.
@@ -363,6 +667,7 @@ def _scalar_to_numpy(data, dtype):
 	return dtype(data)
 
 
+@decodes_keys('__ndarray__')
 def json_nonumpy_obj_hook(dct):
 	"""
 	This hook has no effect except to check if you're trying to decode numpy arrays without support, and give you a useful message.
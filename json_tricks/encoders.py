@@ -1,14 +1,22 @@
 import warnings
 from base64 import standard_b64encode
-from datetime import datetime, date, time, timedelta
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime, date, time, timedelta, timezone
 from decimal import Decimal
 from fractions import Fraction
 from functools import wraps
+from hashlib import blake2b
 from json import JSONEncoder
+from os import fdopen, makedirs, replace
+from os.path import exists, join
+from tempfile import mkstemp
 import sys
 
 from .utils import hashodict, get_module_name_from_object, NoEnumException, NoPandasException, \
-	NoNumpyException, str_type, JsonTricksDeprecation, gzip_compress, filtered_wrapper, is_py3
+	NoNumpyException, str_type, JsonTricksDeprecation, filtered_wrapper, is_py3, encodes_types, \
+	get_encoder_types, matches_encoder_types
+from .compression import resolve_compression
 
 def _fallback_wrapper(encoder):
 	"""
@@ -46,6 +54,7 @@ class TricksEncoder(JSONEncoder):
 		"""
 		:param obj_encoders: An iterable of functions or encoder instances to try.
 		:param silence_typeerror: DEPRECATED - If set to True, ignore the TypeErrors that Encoder instances throw (default False).
+		:param properties: Passed to the encoders. If it contains a `TricksStats` under 'stats', the calls are recorded there.
 		"""
 		if silence_typeerror and not getattr(TricksEncoder, '_deprecated_silence_typeerror'):
 			TricksEncoder._deprecated_silence_typeerror = True
@@ -54,10 +63,20 @@ class TricksEncoder(JSONEncoder):
 		if obj_encoders:
 			self.obj_encoders = list(obj_encoders)
 		self.obj_encoders.extend(_fallback_wrapper(encoder) for encoder in list(fallback_encoders))
-		self.obj_encoders = [filtered_wrapper(enc) for enc in self.obj_encoders]
+		self._declaring_encoders = self.obj_encoders
+		self._encoder_types = None
+		self._type_encoders = {}
+		self.obj_encoders = [filtered_wrapper(enc, ('primitives', 'is_changed', 'properties')) for enc in self.obj_encoders]
+		self.stats = (properties or {}).get('stats', None)
+		if self.stats is not None:
+			self.obj_encoders = [self.stats.wrap_encoder(enc, wrapped)
+				for enc, wrapped in zip(self._declaring_encoders, self.obj_encoders)]
 		self.silence_typeerror = silence_typeerror
 		self.properties = properties
 		self.primitives = primitives
+		self._pack_lists = 0 if primitives else int((properties or {}).get('pack_lists', 0))
+		self._references = not primitives and bool((properties or {}).get('references', False))
+		self._ndarray_dedup = not primitives and bool((properties or {}).get('ndarray_dedup', False))
 		super(TricksEncoder, self).__init__(**json_kwargs)
 
 	def default(self, obj, *args, **kwargs):
@@ -70,36 +89,90 @@ class TricksEncoder(JSONEncoder):
 
 		It never calls the `super` method so if there are non-primitive types
 		left at the end, you'll get an encoding error.
+
+		Encoders that declared their types using `encodes_types` are skipped for other types.
 		"""
 		prev_id = id(obj)
-		for encoder in self.obj_encoders:
-			obj = encoder(obj, primitives=self.primitives, is_changed=id(obj) != prev_id, properties=self.properties)
+		obj_type = type(obj)
+		indices = self._get_type_encoders(obj_type)
+		pos = 0
+		while pos < len(indices):
+			index = indices[pos]
+			obj = self.obj_encoders[index](obj, primitives=self.primitives, is_changed=id(obj) != prev_id, properties=self.properties)
+			pos += 1
+			if type(obj) is not obj_type:
+				# the object was converted, so continue with the encoders that apply to the new type
+				obj_type = type(obj)
+				indices = self._get_type_encoders(obj_type)
+				pos = bisect_right(indices, index)
 		if id(obj) == prev_id:
 			raise TypeError(('Object of type {0:} could not be encoded by {1:} using encoders [{2:s}]. '
 				'You can add an encoders for this type using `extra_obj_encoders`. If you want to \'skip\' this '
 				'object, consider using `fallback_encoders` like `str` or `lambda o: None`.').format(
 					type(obj), self.__class__.__name__, ', '.join(str(encoder) for encoder in self.obj_encoders)))
+		if self._pack_lists:
+			obj = pack_lists(obj, self._pack_lists)
 		return obj
 
-
-def json_date_time_encode(obj, primitives=False):
+	def iterencode(self, o, _one_shot=False):
+		"""
+		Like `JSONEncoder.iterencode`, but also counts the output size if statistics were requested,
+		packs lists if property `pack_lists` is set, and stores repeated objects once if property
+		`references` (same objects) or `ndarray_dedup` (equal numpy arrays) is set.
+		"""
+		if self._pack_lists:
+			o = pack_lists(o, self._pack_lists)
+		if self._references or self._ndarray_dedup:
+			o = share_references(o, self.default, self.sort_keys, self._get_reference_key)
+		chunks = super(TricksEncoder, self).iterencode(o, _one_shot=_one_shot)
+		if self.stats is None:
+			return chunks
+		return self.stats.count_output(chunks)
+
+	def _get_reference_key(self, obj):
+		if self._ndarray_dedup:
+			key = ndarray_content_key(obj)
+			if key is not None:
+				return key
+		return id(obj) if self._references else None
+
+	def _get_type_encoders(self, obj_type):
+		"""
+		Get the (ordered) indices of the encoders that apply to objects of the given type; cached per type.
+		"""
+		try:
+			return self._type_encoders[obj_type]
+		except KeyError:
+			pass
+		if self._encoder_types is None:
+			self._encoder_types = [get_encoder_types(enc) for enc in self._declaring_encoders]
+		indices = tuple(k for k, types in enumerate(self._encoder_types)
+			if matches_encoder_types(obj_type, types))
+		self._type_encoders[obj_type] = indices
+		return indices
+
+
+@encodes_types(date, time, timedelta)
+def json_date_time_encode(obj, primitives=False, properties=None):
 	"""
 	Encode a date, time, datetime or timedelta to a string of a json dictionary, including optional timezone.
 
+	With property `datetime_compact`, the value is stored as an iso string (or microseconds for timedelta),
+	like `{"__datetime__": "2026-10-17T12:00:00.123456+02:00", "tzinfo": "Europe/Amsterdam"}`.
+
 	:param obj: date/time/datetime/timedelta obj
 	:return: (dict) json primitives representation of date, time, datetime or timedelta
 	"""
 	if primitives and isinstance(obj, (date, time, datetime)):
 		return obj.isoformat()
+	if properties and properties.get('datetime_compact', False) and not primitives:
+		return _json_date_time_encode_compact(obj)
 	if isinstance(obj, datetime):
 		dct = hashodict([('__datetime__', None), ('year', obj.year), ('month', obj.month),
 			('day', obj.day), ('hour', obj.hour), ('minute', obj.minute),
 			('second', obj.second), ('microsecond', obj.microsecond)])
 		if obj.tzinfo:
-			if hasattr(obj.tzinfo, 'zone'):
-				dct['tzinfo'] = obj.tzinfo.zone
-			else:
-				dct['tzinfo'] = obj.tzinfo.tzname(None)
+			dct['tzinfo'] = _get_tz_name(obj.tzinfo) or obj.tzinfo.tzname(None)
 			dct['is_dst'] = bool(obj.dst())
 	elif isinstance(obj, date):
 		dct = hashodict([('__date__', None), ('year', obj.year), ('month', obj.month), ('day', obj.day)])
@@ -107,10 +180,7 @@ def json_date_time_encode(obj, primitives=False):
 		dct = hashodict([('__time__', None), ('hour', obj.hour), ('minute', obj.minute),
 			('second', obj.second), ('microsecond', obj.microsecond)])
 		if obj.tzinfo:
-			if hasattr(obj.tzinfo, 'zone'):
-				dct['tzinfo'] = obj.tzinfo.zone
-			else:
-				dct['tzinfo'] = obj.tzinfo.tzname(None)
+			dct['tzinfo'] = _get_tz_name(obj.tzinfo) or obj.tzinfo.tzname(None)
 	elif isinstance(obj, timedelta):
 		if primitives:
 			return obj.total_seconds()
@@ -122,6 +192,231 @@ def json_date_time_encode(obj, primitives=False):
 	return dct
 
 
+def _get_tz_name(tzinfo):
+	"""
+	The name of a pytz or zoneinfo timezone, or None for others (like fixed offsets), which are stored as offset only.
+	"""
+	return getattr(tzinfo, 'zone', None) or getattr(tzinfo, 'key', None)
+
+
+def _json_date_time_encode_compact(obj):
+	if isinstance(obj, datetime):
+		dct = hashodict(__datetime__=obj.isoformat())
+		if obj.tzinfo:
+			# the offset in the iso string determines the instant, so `is_dst` is not needed
+			name = _get_tz_name(obj.tzinfo)
+			if name:
+				dct['tzinfo'] = name
+		return dct
+	if isinstance(obj, date):
+		return hashodict(__date__=obj.isoformat())
+	if isinstance(obj, time):
+		name = _get_tz_name(obj.tzinfo) if obj.tzinfo else None
+		if name is None:
+			return hashodict(__time__=obj.isoformat())
+		return hashodict([('__time__', obj.replace(tzinfo=None).isoformat()), ('tzinfo', name)])
+	if isinstance(obj, timedelta):
+		return hashodict(__timedelta__=(obj.days * 86400 + obj.seconds) * 1000000 + obj.microseconds)
+	return obj
+
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def pack_lists(obj, min_length=1, _memo=None):
+	"""
+	Replace lists that contain only datetimes or only Decimals by a single packed map, e.g.
+	`{"__datetime_array__": [microseconds since epoch], "tzinfo": "Europe/Amsterdam"}`. Lists are found anywhere
+	inside dicts, lists and tuples. Containers are copied if they change; the original object is not modified.
+	A container that appears more than once is only copied once.
+
+	This is used by `TricksEncoder` if property `pack_lists` is True or a minimum length.
+	"""
+	if not isinstance(obj, (dict, list, tuple)):
+		return obj
+	if _memo is None:
+		_memo = {}
+	elif id(obj) in _memo:
+		return _memo[id(obj)][1]
+	packed = None
+	if isinstance(obj, dict):
+		for key, value in obj.items():
+			new_value = pack_lists(value, min_length, _memo)
+			if new_value is not value:
+				if packed is None:
+					packed = obj.copy()
+				packed[key] = new_value
+	else:
+		if obj and len(obj) >= min_length:
+			packed = _pack_list(obj)
+		if packed is None:
+			for index, value in enumerate(obj):
+				new_value = pack_lists(value, min_length, _memo)
+				if new_value is not value:
+					if packed is None:
+						packed = list(obj)
+					packed[index] = new_value
+	# the original is kept, so that its id is not reused by another container
+	_memo[id(obj)] = (obj, obj if packed is None else packed)
+	return _memo[id(obj)][1]
+
+
+def _pack_list(values):
+	first_type = type(values[0])
+	if first_type is datetime:
+		if not all(type(value) is datetime for value in values):
+			return None
+		return _pack_datetimes(values)
+	if first_type is Decimal:
+		if not all(type(value) is Decimal for value in values):
+			return None
+		return hashodict(__decimal_array__=[str(value.canonical()) for value in values])
+	return None
+
+
+def _pack_datetimes(values):
+	"""
+	Naive datetimes are stored relative to the epoch, aware ones in UTC. Aware ones are only packed if they all
+	have the same named timezone, since fixed offsets and others could not be restored.
+	"""
+	tzinfo = values[0].tzinfo
+	if tzinfo is None:
+		if any(value.tzinfo is not None for value in values):
+			return None
+		return hashodict(__datetime_array__=[(value - _EPOCH) // _MICROSECOND for value in values])
+	name = _get_tz_name(tzinfo)
+	if name is None or any(value.tzinfo is None or _get_tz_name(value.tzinfo) != name for value in values):
+		return None
+	return hashodict([('__datetime_array__', [(value - _EPOCH_UTC) // _MICROSECOND for value in values]),
+		('tzinfo', name)])
+
+
+_PLAIN_TYPES = frozenset((str, int, float, bool, type(None)))
+# identity does not matter for these (and Python reuses e.g. constant tuples), so they are never shared
+_IMMUTABLE_TYPES = (tuple, frozenset, bytes, complex, Decimal, Fraction, date, time, timedelta)
+
+
+def share_references(obj, convert, sort_keys=False, get_key=id):
+	"""
+	Store objects that appear more than once only once. The first occurrence becomes `{"__ref__": n, "value": ...}`
+	and later ones `{"__ref__": n}`, which `json_reference_hook` restores as the same object if the same property is
+	passed when loading. Later occurrences that are equal but not the same object get `"equal": true`.
+
+	This is used by `TricksEncoder` if property `references` or `ndarray_dedup` is set. Objects that are not json types
+	are converted once, using `convert` (the encoders). Immutable values, like strings, numbers and tuples, are never
+	shared.
+
+	:param sort_keys: Visit dicts in sorted order, like the json encoder, so that definitions come before references.
+	:param get_key: Function that gives the key by which objects are the same, like `id` (default), or None if
+		the object should not be shared.
+	:return: A structure of only json types.
+	"""
+	return _SharedReferences(convert, sort_keys, get_key).encode(obj)
+
+
+def _is_plain(obj):
+	return type(obj) in _PLAIN_TYPES or isinstance(obj, (str_type, int, float))
+
+
+class _SharedReferences(object):
+	def __init__(self, convert, sort_keys, get_key):
+		self.convert = convert
+		self.sort_keys = sort_keys
+		self.get_key = get_key
+		self.keys = {}
+		self.counts = {}
+		self.first_ids = {}
+		self.converted = {}
+		self.unshared = set()
+		self.refs = {}
+		self.active = set()
+
+	def encode(self, obj):
+		self.count(obj)
+		return self.build(obj)
+
+	def count(self, obj):
+		"""
+		Count how often each object occurs, including inside converted objects, which are converted only once.
+		"""
+		stack = [obj]
+		while stack:
+			item = stack.pop()
+			if _is_plain(item):
+				continue
+			if id(item) in self.keys:
+				self.counts[self.keys[id(item)]] += 1
+				continue
+			key = None if isinstance(item, _IMMUTABLE_TYPES) else self.get_key(item)
+			if key is None:
+				# not shared, but it still needs a key for when it occurs again
+				key = ('unshared', id(item))
+				self.unshared.add(key)
+			# ids stay unique, since every item is part of obj or of an object in self.converted
+			self.keys[id(item)] = key
+			if key in self.counts:
+				self.counts[key] += 1
+				continue
+			self.counts[key] = 1
+			if isinstance(item, dict):
+				stack.extend(item.values())
+			elif isinstance(item, (list, tuple)):
+				stack.extend(item)
+			else:
+				self.converted[key] = self.convert(item)
+				stack.append(self.converted[key])
+
+	def build(self, obj):
+		if _is_plain(obj):
+			return obj
+		# every object that is being built is active, also if it is not shared, so that all cycles are found
+		if id(obj) in self.active:
+			raise ValueError('Circular reference detected')
+		key = self.keys[id(obj)]
+		if key in self.refs:
+			if self.first_ids[key] != id(obj):
+				return hashodict([('__ref__', self.refs[key]), ('equal', True)])
+			return hashodict(__ref__=self.refs[key])
+		shared = self.counts[key] > 1 and key not in self.unshared
+		if shared:
+			self.refs[key] = len(self.refs)
+			self.first_ids[key] = id(obj)
+		self.active.add(id(obj))
+		if isinstance(obj, dict):
+			items = sorted(obj.items()) if self.sort_keys else obj.items()
+			values = [v if type(v) in _PLAIN_TYPES else self.build(v) for k, v in items]
+			# containers without converted or shared content are used as-is
+			value = obj
+			if any(new is not v for new, (k, v) in zip(values, items)):
+				value = OrderedDict((k, new) for new, (k, v) in zip(values, items))
+		elif isinstance(obj, (list, tuple)):
+			value = [v if type(v) in _PLAIN_TYPES else self.build(v) for v in obj]
+			if all(new is v for new, v in zip(value, obj)):
+				value = obj
+		else:
+			value = self.build(self.converted[key])
+		self.active.discard(id(obj))
+		if not shared:
+			return value
+		return hashodict([('__ref__', self.refs[key]), ('value', value)])
+
+
+def ndarray_content_key(obj):
+	"""
+	The key by which numpy arrays are deduplicated: arrays with the same dtype, shape and data have the same key.
+	Returns None for other objects, for arrays of Python objects and for 0-d arrays (which are loaded as scalars).
+	"""
+	numpy = sys.modules.get('numpy')
+	if numpy is None or type(obj) is not numpy.ndarray or obj.dtype.hasobject or obj.shape == ():
+		return None
+	data = numpy.ascontiguousarray(obj).reshape(-1).view(numpy.uint8)
+	digest = blake2b(data, digest_size=16).digest()
+	return ('ndarray', obj.dtype, obj.shape, digest)
+
+
+@encodes_types('enum.Enum')
 def enum_instance_encode(obj, primitives=False, with_enum_value=False):
 	"""Encodes an enum instance to json. Note that it can only be recovered if the environment allows the enum to be
 	imported in the same way.
@@ -154,6 +449,58 @@ def noenum_instance_encode(obj, primitives=False):
 	return obj
 
 
+_CLASS_PLAN_CACHE_SIZE = 1024
+_class_encoding_plans = {}
+
+
+def _make_class_encoding_plan(obj):
+	if not (hasattr(obj, '__dict__') or hasattr(obj, '__slots__')):
+		return None
+	if not hasattr(obj, '__new__'):
+		raise TypeError('class "{0:s}" does not have a __new__ method; '.format(obj.__class__) +
+			('perhaps it is an old-style class not derived from `object`; add `object` as a base class to encode it.'
+				if (sys.version[:2] == '2.') else 'this should not happen in Python3'))
+	if type(obj) == type(lambda: 0):
+		raise TypeError('instance "{0:}" of class "{1:}" cannot be encoded because it appears to be a lambda or function.'
+			.format(obj, obj.__class__))
+	try:
+		obj.__new__(obj.__class__)
+	except TypeError:
+		raise TypeError(('instance "{0:}" of class "{1:}" cannot be encoded, perhaps because it\'s __new__ method '
+			'cannot be called because it requires extra parameters').format(obj, obj.__class__))
+	mod = get_module_name_from_object(obj)
+	if mod == 'threading':
+		# In Python2, threading objects get serialized, which is probably unsafe
+		return None
+	slots = None
+	if hasattr(obj, '__slots__'):
+		slots = obj.__slots__
+		if isinstance(slots, str):
+			slots = [slots]
+		slots = tuple(s for s in slots if s not in ('__dict__', '__weakref__'))
+	return mod, obj.__class__.__name__, slots, hasattr(obj, '__json_encode__'), hasattr(obj, '__dict__')
+
+
+def _get_class_encoding_plan(obj):
+	"""
+	Find how to encode instances of the class of `obj`: a tuple of module, class name, slots,
+	whether it has `__json_encode__` and whether it has `__dict__`; or None if it should not be encoded.
+	This is cached per class, so that the (slow) checks are done once instead of for every instance.
+	"""
+	cls = obj.__class__
+	try:
+		return _class_encoding_plans[cls]
+	except KeyError:
+		pass
+	except TypeError:
+		return _make_class_encoding_plan(obj)
+	plan = _make_class_encoding_plan(obj)
+	if len(_class_encoding_plans) >= _CLASS_PLAN_CACHE_SIZE:
+		_class_encoding_plans.clear()
+	_class_encoding_plans[cls] = plan
+	return plan
+
+
 def class_instance_encode(obj, primitives=False):
 	"""
 	Encodes a class instance to json. Note that it can only be recovered if the environment allows the class to be
@@ -161,53 +508,30 @@ def class_instance_encode(obj, primitives=False):
 	"""
 	if isinstance(obj, list) or isinstance(obj, dict):
 		return obj
-	if hasattr(obj, '__class__') and (hasattr(obj, '__dict__') or hasattr(obj, '__slots__')):
-		if not hasattr(obj, '__new__'):
-			raise TypeError('class "{0:s}" does not have a __new__ method; '.format(obj.__class__) +
-				('perhaps it is an old-style class not derived from `object`; add `object` as a base class to encode it.'
-					if (sys.version[:2] == '2.') else 'this should not happen in Python3'))
-		if type(obj) == type(lambda: 0):
-			raise TypeError('instance "{0:}" of class "{1:}" cannot be encoded because it appears to be a lambda or function.'
-				.format(obj, obj.__class__))
-		try:
-			obj.__new__(obj.__class__)
-		except TypeError:
-			raise TypeError(('instance "{0:}" of class "{1:}" cannot be encoded, perhaps because it\'s __new__ method '
-				'cannot be called because it requires extra parameters').format(obj, obj.__class__))
-		mod = get_module_name_from_object(obj)
-		if mod == 'threading':
-			# In Python2, threading objects get serialized, which is probably unsafe
-			return obj
-		name = obj.__class__.__name__
-		if hasattr(obj, '__json_encode__'):
-			attrs = obj.__json_encode__()
-			if primitives:
-				return attrs
-			else:
-				return hashodict((('__instance_type__', (mod, name)), ('attributes', attrs)))
-		dct = hashodict([('__instance_type__',(mod, name))])
-		if hasattr(obj, '__slots__'):
-			slots = obj.__slots__
-			if isinstance(slots, str):
-				slots = [slots]
-			dct['slots'] = hashodict([])
-			for s in slots:
-				if s == '__dict__':
-					continue
-				if s == '__weakref__':
-					continue
-				dct['slots'][s] = getattr(obj, s)
-		if hasattr(obj, '__dict__'):
-			dct['attributes'] = hashodict(obj.__dict__)
+	plan = _get_class_encoding_plan(obj)
+	if plan is None:
+		return obj
+	mod, name, slots, has_json_encode, has_dict = plan
+	if has_json_encode:
+		attrs = obj.__json_encode__()
 		if primitives:
-			attrs = dct.get('attributes',{})
-			attrs.update(dct.get('slots',{}))
 			return attrs
 		else:
-			return dct
-	return obj
+			return hashodict((('__instance_type__', (mod, name)), ('attributes', attrs)))
+	dct = hashodict([('__instance_type__',(mod, name))])
+	if slots is not None:
+		dct['slots'] = hashodict([(s, getattr(obj, s)) for s in slots])
+	if has_dict:
+		dct['attributes'] = hashodict(obj.__dict__)
+	if primitives:
+		attrs = dct.get('attributes',{})
+		attrs.update(dct.get('slots',{}))
+		return attrs
+	else:
+		return dct
 
 
+@encodes_types(complex)
 def json_complex_encode(obj, primitives=False):
 	"""
 	Encode a complex number as a json dictionary of its real and imaginary part.
@@ -223,6 +547,7 @@ def json_complex_encode(obj, primitives=False):
 	return obj
 
 
+@encodes_types(bytes)
 def bytes_encode(obj, primitives=False):
 	"""
 	Encode bytes as one of these:
@@ -246,6 +571,7 @@ def bytes_encode(obj, primitives=False):
 	return obj
 
 
+@encodes_types(Decimal, Fraction)
 def numeric_types_encode(obj, primitives=False):
 	"""
 	Encode Decimal and Fraction.
@@ -271,6 +597,7 @@ def numeric_types_encode(obj, primitives=False):
 	return obj
 
 
+@encodes_types('pathlib.Path')
 def pathlib_encode(obj, primitives=False):
 	from pathlib import Path
 	if not isinstance(obj, Path):
@@ -281,6 +608,7 @@ def pathlib_encode(obj, primitives=False):
 
 	return {'__pathlib__': str(obj)}
 
+@encodes_types(slice)
 def slice_encode(obj, primitives=False):
 	if not isinstance(obj, slice):
 		return obj
@@ -310,6 +638,7 @@ class ClassInstanceEncoder(JSONEncoder):
 		return super(ClassInstanceEncoder, self).default(obj, *args, **kwargs)
 
 
+@encodes_types(set)
 def json_set_encode(obj, primitives=False):
 	"""
 	Encode python sets as dictionary with key __set__ and a list of the values.
@@ -328,8 +657,19 @@ def json_set_encode(obj, primitives=False):
 	return obj
 
 
-def pandas_encode(obj, primitives=False):
+@encodes_types('pandas.DataFrame', 'pandas.Series')
+def pandas_encode(obj, primitives=False, properties=None):
+	"""
+	Encodes pandas `DataFrame`s and `Series` as maps of columns, with meta data.
+
+	If property `pandas_columnar` is True, numeric columns (and the index) are passed to `numpy_encode` as whole
+	arrays, so that e.g. `ndarray_compact` stores each of them as one binary block, instead of as a list of numbers.
+
+	Categorical, datetime, timedelta, nullable and string columns are stored as arrays of codes, epoch
+	integers, or values plus mask (see `_pandas_extension_values`), instead of one object per cell.
+	"""
 	from pandas import DataFrame, Series
+	columnar = not primitives and bool((properties or {}).get('pandas_columnar', False))
 	if isinstance(obj, DataFrame):
 		repr = hashodict()
 		if not primitives:
@@ -337,9 +677,9 @@ def pandas_encode(obj, primitives=False):
 				('column_order', tuple(obj.columns.values)),
 				('types', tuple(str(dt) for dt in obj.dtypes)),
 			))
-		repr['index'] = tuple(obj.index.values)
+		repr['index'] = _pandas_values(obj.index, primitives, columnar)
 		for k, name in enumerate(obj.columns.values):
-			repr[name] = tuple(obj.iloc[:, k].values)
+			repr[name] = _pandas_values(obj.iloc[:, k], primitives, columnar)
 		return repr
 	if isinstance(obj, Series):
 		repr = hashodict()
@@ -348,12 +688,93 @@ def pandas_encode(obj, primitives=False):
 				('name', str(obj.name)),
 				('type', str(obj.dtype)),
 			))
-		repr['index'] = tuple(obj.index.values)
-		repr['data'] = tuple(obj.values)
+		repr['index'] = _pandas_values(obj.index, primitives, columnar)
+		repr['data'] = _pandas_values(obj, primitives, columnar)
 		return repr
 	return obj
 
 
+def _pandas_values(container, primitives, columnar):
+	"""
+	Convert the values of a pandas column or index to a list, or for columnar mode, to a contiguous ndarray if possible.
+	This avoids converting every value to a numpy scalar that has to be encoded separately.
+	"""
+	from numpy import ndarray, ascontiguousarray
+	from pandas.api.types import is_extension_array_dtype
+	if is_extension_array_dtype(container.dtype):
+		if primitives:
+			return container.array.to_numpy(dtype=object, na_value=None).tolist()
+		return _pandas_extension_values(container.array, columnar)
+	values = container.values
+	if not primitives and isinstance(values, ndarray) and values.dtype.kind in 'mM':
+		return _pandas_extension_values(container.array, columnar)
+	if columnar and isinstance(values, ndarray) and not values.dtype.hasobject:
+		return ascontiguousarray(values)
+	return values.tolist()
+
+
+def _pandas_extension_values(values, columnar):
+	"""
+	Encode a pandas extension array as a map with key `__pandas_array__`, which contains the kind of array:
+
+	* 'category': integer `codes` and `categories`;
+	* 'datetime': integer `values` since epoch in UTC, with `unit` and `tz` (which is None for naive datetimes);
+	* 'timedelta': integer `values` with `unit`;
+	* 'masked': `values` (nullable integer, float or boolean) and a boolean `mask` which is True for missing values;
+	* 'string': a list of strings, with None for missing values.
+
+	Other extension arrays are stored as a list of their values.
+	"""
+	from numpy import ascontiguousarray, datetime_data
+	from pandas import CategoricalDtype, DatetimeTZDtype, StringDtype, Index, arrays
+	dtype = values.dtype
+	def as_values(arr):
+		return ascontiguousarray(arr) if columnar else arr.tolist()
+	if isinstance(dtype, CategoricalDtype):
+		return hashodict((
+			('__pandas_array__', 'category'),
+			('categories', _pandas_values(Index(dtype.categories), False, columnar)),
+			('codes', as_values(values.codes)),
+			('ordered', bool(dtype.ordered)),
+		))
+	if isinstance(dtype, DatetimeTZDtype):
+		return hashodict((
+			('__pandas_array__', 'datetime'),
+			('unit', dtype.unit),
+			('tz', str(dtype.tz)),
+			('values', as_values(values.asi8)),
+		))
+	if isinstance(values, arrays.DatetimeArray):
+		return hashodict((
+			('__pandas_array__', 'datetime'),
+			('unit', datetime_data(dtype)[0]),
+			('tz', None),
+			('values', as_values(values.asi8)),
+		))
+	if isinstance(values, arrays.TimedeltaArray):
+		return hashodict((
+			('__pandas_array__', 'timedelta'),
+			('unit', datetime_data(dtype)[0]),
+			('values', as_values(values.asi8)),
+		))
+	masked_types = tuple(getattr(arrays, name) for name in ('IntegerArray', 'FloatingArray', 'BooleanArray')
+		if hasattr(arrays, name))
+	if isinstance(values, masked_types):
+		return hashodict((
+			('__pandas_array__', 'masked'),
+			('dtype', str(dtype)),
+			('values', as_values(values.to_numpy(dtype=dtype.numpy_dtype, na_value=dtype.numpy_dtype.type(0)))),
+			('mask', as_values(values.isna())),
+		))
+	if isinstance(dtype, StringDtype):
+		return hashodict((
+			('__pandas_array__', 'string'),
+			('dtype', str(dtype)),
+			('values', values.to_numpy(dtype=object, na_value=None).tolist()),
+		))
+	return values.to_numpy(dtype=object, na_value=None).tolist()
+
+
 def nopandas_encode(obj):
 	if ('DataFrame' in getattr(obj.__class__, '__name__', '') or 'Series' in getattr(obj.__class__, '__name__', '')) \
 			and 'pandas.' in getattr(obj.__class__, '__module__', ''):
@@ -362,6 +783,7 @@ def nopandas_encode(obj):
 	return obj
 
 
+@encodes_types('numpy.ndarray', 'numpy.generic')
 def numpy_encode(obj, primitives=False, properties=None):
 	"""
 	Encodes numpy `ndarray`s as lists with meta data.
@@ -371,6 +793,12 @@ def numpy_encode(obj, primitives=False, properties=None):
 	which never reach the encoder.
 
 	:param primitives: If True, arrays are serialized as (nested) lists without meta info.
+
+	If property `ndarray_sidecar` is a directory, arrays are saved there as separate `.npy` files, which
+	the json refers to. Property `ndarray_sidecar_min_size` sets the minimum number of elements for this.
+
+	Compact arrays are compressed with gzip at level 9, or with the format from property `ndarray_compression`, which is
+	the name of a format from `json_tricks.compression` (or a tuple of name and level), or False for none.
 	"""
 	from numpy import ndarray, generic
 
@@ -395,9 +823,15 @@ def numpy_encode(obj, primitives=False, properties=None):
 			# elements from which compact storage is used.
 			if isinstance(use_compact, int) and not isinstance(use_compact, bool):
 				use_compact = obj.size >= use_compact
-			if use_compact:
+			sidecar_dir = properties.get('ndarray_sidecar', None)
+			if sidecar_dir is not None and obj.shape and not obj.dtype.hasobject and \
+					obj.size >= properties.get('ndarray_sidecar_min_size', 0):
+				use_compact = False
+				data_json = _ndarray_to_sidecar(obj, sidecar_dir)
+			elif use_compact:
 				# If the overall json file is compressed, then don't compress the array.
-				data_json = _ndarray_to_bin_str(obj, do_compress=not json_compression, store_endianness=store_endianness)
+				compression = False if json_compression else properties.get('ndarray_compression', ('gzip', 9))
+				data_json = _ndarray_to_bin_str(obj, compression=compression, store_endianness=store_endianness)
 			else:
 				data_json = obj.tolist()
 			dct = hashodict((
@@ -418,9 +852,9 @@ def numpy_encode(obj, primitives=False, properties=None):
 	return obj
 
 
-def _ndarray_to_bin_str(array, do_compress, store_endianness):
+def _ndarray_to_bin_str(array, compression, store_endianness):
 	"""
-	From ndarray to base64 encoded, gzipped binary data.
+	From ndarray to base64 encoded, compressed binary data.
 	"""
 	from base64 import standard_b64encode
 	assert array.flags['C_CONTIGUOUS'], 'only C memory order is (currently) supported for compact ndarray format'
@@ -430,15 +864,38 @@ def _ndarray_to_bin_str(array, do_compress, store_endianness):
 	if store_endianness in ['little', 'big'] and store_endianness != sys.byteorder:
 		array = array.byteswap(inplace=False)
 	data = array.data
-	if do_compress:
-		small = gzip_compress(data, compresslevel=9)
+	codec, level = resolve_compression(compression)
+	if codec is not None:
+		small = codec.compress(data, level)
 		if len(small) < 0.9 * original_size and len(small) < original_size - 8:
-			header = 'b64.gz:'
+			header = 'b64.{0:s}:'.format(codec.tag)
 			data = small
 	data = standard_b64encode(data)
 	return header + data.decode('ascii')
 
 
+def _ndarray_to_sidecar(array, directory):
+	"""
+	Save ndarray to a .npy file in the given directory, and return the reference to store in the json.
+
+	The file is named after a hash of the dtype, shape and data, so dumping the same array again reuses the
+	file instead of adding a new one. Files of arrays that changed are not removed. The directory is created
+	if it does not exist.
+	"""
+	from numpy import ascontiguousarray, save, uint8
+	digest = blake2b(str((array.dtype.str, array.shape)).encode('ascii'), digest_size=16)
+	digest.update(ascontiguousarray(array).reshape(-1).view(uint8))
+	name = 'ndarray-{0:s}.npy'.format(digest.hexdigest())
+	path = join(directory, name)
+	if not exists(path):
+		makedirs(directory, exist_ok=True)
+		fd, tmp_path = mkstemp(dir=directory, prefix='ndarray-', suffix='.tmp')
+		with fdopen(fd, 'wb') as fh:
+			save(fh, array, allow_pickle=False)
+		replace(tmp_path, path)
+	return 'npy:' + name
+
+
 class NumpyEncoder(ClassInstanceEncoder):
 	"""
 	JSON encoder for numpy arrays.
@@ -1,18 +1,21 @@
 import warnings
-from json import loads as json_loads
+from codecs import getincrementaldecoder
+from json import JSONDecoder, loads as json_loads
+from re import compile as re_compile
 from os import fsync
 from sys import exc_info
 
-from json_tricks.utils import is_py3, dict_default, gzip_compress, gzip_decompress, JsonTricksDeprecation
+from json_tricks.utils import is_py3, dict_default, JsonTricksDeprecation, is_module_available
+from .compression import resolve_compression, detect_compression, COMPRESSION_CODECS
 from .utils import str_type, NoNumpyException  # keep 'unused' imports
-from .comment import strip_comments  # keep 'unused' imports
+from .comment import strip_comments, has_comments  # keep 'unused' imports
 #TODO @mark: imports removed?
 from .encoders import TricksEncoder, json_date_time_encode, \
 	class_instance_encode, json_complex_encode, json_set_encode, numeric_types_encode, numpy_encode, \
 	nonumpy_encode, nopandas_encode, pandas_encode, noenum_instance_encode, \
 	enum_instance_encode, pathlib_encode, bytes_encode, slice_encode  # keep 'unused' imports
 from .decoders import TricksPairHook, \
-	json_date_time_hook, ClassInstanceHook, \
+	json_date_time_hook, json_packed_list_hook, json_reference_hook, ClassInstanceHook, \
 	json_complex_hook, json_set_hook, numeric_types_hook, json_numpy_obj_hook, \
 	json_nonumpy_obj_hook, \
 	nopandas_hook, pandas_hook, EnumInstanceHook, \
@@ -20,6 +23,10 @@ from .decoders import TricksPairHook, \
 
 
 ENCODING = 'UTF-8'
+CHUNK_SIZE = 65536
+LINES_BATCH_SIZE = 1024
+_WHITESPACE = re_compile(r'[ \t\n\r]*')
+_MAX_PARTIAL_TOKEN = len('-Infinity')
 
 
 _cih_instance = ClassInstanceHook()
@@ -37,6 +44,8 @@ DEFAULT_ENCODERS = [
 
 DEFAULT_HOOKS = [
     json_date_time_hook,
+    json_packed_list_hook,
+    json_reference_hook,
     json_complex_hook,
     json_set_hook,
     numeric_types_hook,
@@ -47,6 +56,7 @@ DEFAULT_HOOKS = [
 
 
 #TODO @mark: add properties to all built-in encoders (for speed - but it should keep working without)
+# numpy and pandas are not imported here, since that is slow; their encoders and hooks import them when needed
 try:
 	import enum
 except ImportError:
@@ -56,24 +66,20 @@ else:
 	DEFAULT_ENCODERS = [enum_instance_encode,] + DEFAULT_ENCODERS
 	DEFAULT_HOOKS = [_eih_instance,] + DEFAULT_HOOKS
 
-try:
-	import numpy
-except ImportError:
-	DEFAULT_ENCODERS = [nonumpy_encode,] + DEFAULT_ENCODERS
-	DEFAULT_HOOKS = [json_nonumpy_obj_hook,] + DEFAULT_HOOKS
-else:
+if is_module_available('numpy'):
 	# numpy encode needs to be before complex
 	DEFAULT_ENCODERS = [numpy_encode,] + DEFAULT_ENCODERS
 	DEFAULT_HOOKS = [json_numpy_obj_hook,] + DEFAULT_HOOKS
-
-try:
-	import pandas
-except ImportError:
-	DEFAULT_ENCODERS = [nopandas_encode,] + DEFAULT_ENCODERS
-	DEFAULT_HOOKS = [nopandas_hook,] + DEFAULT_HOOKS
 else:
+	DEFAULT_ENCODERS = [nonumpy_encode,] + DEFAULT_ENCODERS
+	DEFAULT_HOOKS = [json_nonumpy_obj_hook,] + DEFAULT_HOOKS
+
+if is_module_available('pandas'):
 	DEFAULT_ENCODERS = [pandas_encode,] + DEFAULT_ENCODERS
 	DEFAULT_HOOKS = [pandas_hook,] + DEFAULT_HOOKS
+else:
+	DEFAULT_ENCODERS = [nopandas_encode,] + DEFAULT_ENCODERS
+	DEFAULT_HOOKS = [nopandas_hook,] + DEFAULT_HOOKS
 
 try:
 	import pathlib
@@ -106,10 +112,20 @@ def dumps(obj, sort_keys=None, cls=None, obj_encoders=DEFAULT_ENCODERS, extra_ob
 	:param allow_nan: Allow NaN and Infinity values, which is a (useful) violation of the JSON standard (default False).
 	:param conv_str_byte: Try to automatically convert between strings and bytes (assuming utf-8) (default False).
 	:param properties: A dictionary of properties that is passed to each encoder that will accept it.
+	:param compression: True for gzip, an integer for the gzip level, or the name of a format from `json_tricks.compression`
+		like 'lzma', or a tuple of name and level. None or False for no compression (default).
 	:return: The string containing the json-encoded version of obj.
 
 	Other arguments are passed on to `cls`. Note that `sort_keys` should be false if you want to preserve order.
 	"""
+	combined_encoder = _make_encoder(sort_keys=sort_keys, cls=cls, obj_encoders=obj_encoders,
+		extra_obj_encoders=extra_obj_encoders, primitives=primitives, compression=compression, allow_nan=allow_nan,
+		fallback_encoders=fallback_encoders, properties=properties, jsonkwargs=jsonkwargs)
+	return _encode(combined_encoder, obj, compression)
+
+
+def _make_encoder(sort_keys, cls, obj_encoders, extra_obj_encoders, primitives, compression, allow_nan,
+		fallback_encoders, properties, jsonkwargs):
 	if not hasattr(extra_obj_encoders, '__iter__'):
 		raise TypeError('`extra_obj_encoders` should be a tuple in `json_tricks.dump(s)`')
 	encoders = tuple(extra_obj_encoders) + tuple(obj_encoders)
@@ -119,69 +135,87 @@ def dumps(obj, sort_keys=None, cls=None, obj_encoders=DEFAULT_ENCODERS, extra_ob
 	dict_default(properties, 'allow_nan', allow_nan)
 	if cls is None:
 		cls = TricksEncoder
-	combined_encoder = cls(sort_keys=sort_keys, obj_encoders=encoders, allow_nan=allow_nan,
+	return cls(sort_keys=sort_keys, obj_encoders=encoders, allow_nan=allow_nan,
 		primitives=primitives, fallback_encoders=fallback_encoders,
 	  	properties=properties, **jsonkwargs)
+
+
+def _encode(combined_encoder, obj, compression):
 	txt = combined_encoder.encode(obj)
 	if not is_py3 and isinstance(txt, str):
 		txt = unicode(txt, ENCODING)
-	if not compression:
+	codec, level = resolve_compression(compression)
+	if codec is None:
 		return txt
-	if compression is True:
-		compression = 5
-	txt = txt.encode(ENCODING)
-	gzstring = gzip_compress(txt, compresslevel=compression)
-	return gzstring
+	return codec.compress(txt.encode(ENCODING), level)
 
 
 def dump(obj, fp, sort_keys=None, cls=None, obj_encoders=DEFAULT_ENCODERS, extra_obj_encoders=(),
 		primitives=False, compression=None, force_flush=False, allow_nan=False, conv_str_byte=False,
-		fallback_encoders=(), properties=None, **jsonkwargs):
+		fallback_encoders=(), properties=None, stream=False, **jsonkwargs):
 	"""
 	Convert a nested data structure to a json string.
 
 	:param fp: File handle or path to write to.
-	:param compression: The gzip compression level, or None for no compression.
+	:param compression: The gzip compression level, or another compression format (see `dumps`), or None for no compression.
 	:param force_flush: If True, flush the file handle used, when possibly also in the operating system (default False).
+	:param stream: If True, the json is encoded and written (and compressed) in chunks, so the full string is never
+		held in memory. This is slower for small data, and returns None instead of the json.
 
 	The other arguments are identical to `dumps`.
 	"""
+	_check_dump_arg_order(obj, fp)
+	combined_encoder = _make_encoder(sort_keys=sort_keys, cls=cls, obj_encoders=obj_encoders,
+		extra_obj_encoders=extra_obj_encoders, primitives=primitives, compression=compression, allow_nan=allow_nan,
+		fallback_encoders=fallback_encoders, properties=properties, jsonkwargs=jsonkwargs)
+	if stream:
+		_stream_file(combined_encoder.iterencode(obj), fp, compression=compression, force_flush=force_flush,
+			conv_str_byte=conv_str_byte)
+		return None
+	txt = _encode(combined_encoder, obj, compression)
+	_write_file(txt, fp, compression=compression, force_flush=force_flush, conv_str_byte=conv_str_byte)
+	return txt
+
+
+def _check_dump_arg_order(obj, fp):
 	if (isinstance(obj, str_type) or hasattr(obj, 'write')) and isinstance(fp, (list, dict)):
 		raise ValueError('json-tricks dump arguments are in the wrong order: provide the data to be serialized before file handle')
-	txt = dumps(obj, sort_keys=sort_keys, cls=cls, obj_encoders=obj_encoders, extra_obj_encoders=extra_obj_encoders,
-		primitives=primitives, compression=compression, allow_nan=allow_nan, conv_str_byte=conv_str_byte,
-		fallback_encoders=fallback_encoders, properties=properties, **jsonkwargs)
+
+
+def _write_file(data, fp, compression, force_flush, conv_str_byte):
+	"""
+	Write the complete output of `dumps`, which is bytes if compressed, and text otherwise.
+	"""
+	_stream_file((data,), fp, compression=compression, force_flush=force_flush, conv_str_byte=conv_str_byte,
+		compressed=isinstance(data, bytes))
+
+
+def _stream_file(chunks, fp, compression, force_flush, conv_str_byte, append=False, compressed=False):
+	codec, level = resolve_compression(compression)
 	if isinstance(fp, str_type):
+		mode = 'a+' if append else 'w+'
 		if compression:
-			fh = open(fp, 'wb+')
+			fh = open(fp, mode + 'b')
 		else:
-			fh = open(fp, 'w+')
+			fh = open(fp, mode)
 	else:
 		fh = fp
-		if conv_str_byte:
-			try:
-				fh.write(b'')
-			except TypeError:
-				pass
-				# if not isinstance(txt, str_type):
-				#		# Cannot write bytes, so must be in text mode, but we didn't get a text
-				#		if not compression:
-				#			txt = txt.decode(ENCODING)
-			else:
-				try:
-					fh.write(u'')
-				except TypeError:
-					if isinstance(txt, str_type):
-						txt = txt.encode(ENCODING)
 	try:
-		if compression and 'b' not in getattr(fh, 'mode', 'b?') and not isinstance(txt, str_type):
+		if compression and 'b' not in getattr(fh, 'mode', 'b?'):
 			raise IOError('If compression is enabled, the file must be opened in binary mode.')
-		try:
-			fh.write(txt)
-		except TypeError as err:
-			err.args = (err.args[0] + '. A possible reason is that the file is not opened in binary mode; '
-				'be sure to set file mode to something like "wb".',)
-			raise
+		write_bytes = False
+		if conv_str_byte and not compression and not isinstance(fp, str_type):
+			write_bytes = _is_binary_handle(fh)
+		if compressed:
+			for chunk in chunks:
+				_write_chunk(fh, chunk)
+		elif codec is not None:
+			with codec.writer(fh, level) as compressed_fh:
+				for chunk in _join_chunks(chunks):
+					_write_chunk(compressed_fh, chunk.encode(ENCODING))
+		else:
+			for chunk in _join_chunks(chunks):
+				_write_chunk(fh, chunk.encode(ENCODING) if write_bytes else chunk)
 	finally:
 		if force_flush:
 			fh.flush()
@@ -192,7 +226,94 @@ def dump(obj, fp, sort_keys=None, cls=None, obj_encoders=DEFAULT_ENCODERS, extra
 				pass
 		if isinstance(fp, str_type):
 			fh.close()
-	return txt
+
+
+def dump_lines(records, fp, sort_keys=None, cls=None, obj_encoders=DEFAULT_ENCODERS, extra_obj_encoders=(),
+		primitives=False, compression=None, append=False, force_flush=False, allow_nan=False, conv_str_byte=False,
+		fallback_encoders=(), properties=None, threads=None, **jsonkwargs):
+	"""
+	Write an iterable of records as JSON Lines, which has one json value per line. All records are encoded
+	with the same encoder, and written in chunks.
+
+	:param records: An iterable of Python objects to convert; each becomes one line.
+	:param fp: File handle or path to write to.
+	:param append: If `fp` is a path, add to the end of the file instead of replacing it. This also works with compression.
+	:param threads: If more than 1, encode records in a pool of this many threads. This only helps if encoding is
+		mostly done outside of Python, e.g. when compressing arrays.
+
+	The other arguments are identical to `dump`, but `indent` is not supported. Use `load_lines` to read the records.
+	"""
+	combined_encoder = _make_encoder(sort_keys=sort_keys, cls=cls, obj_encoders=obj_encoders,
+		extra_obj_encoders=extra_obj_encoders, primitives=primitives, compression=compression, allow_nan=allow_nan,
+		fallback_encoders=fallback_encoders, properties=properties, jsonkwargs=jsonkwargs)
+	_stream_file(_encode_lines(combined_encoder, records, threads), fp, compression=compression,
+		force_flush=force_flush, conv_str_byte=conv_str_byte, append=append)
+
+
+def _encode_lines(combined_encoder, records, threads):
+	if getattr(combined_encoder, 'indent', None) is not None:
+		raise ValueError('`indent` cannot be used for JSON Lines, since each record must be on a single line')
+	return _iter_encoded_lines(combined_encoder, records, threads)
+
+
+def _iter_encoded_lines(combined_encoder, records, threads):
+	if not threads or threads <= 1:
+		for record in records:
+			yield combined_encoder.encode(record)
+			yield '\n'
+		return
+	from concurrent.futures import ThreadPoolExecutor
+	with ThreadPoolExecutor(max_workers=threads) as pool:
+		batch = []
+		for record in records:
+			batch.append(record)
+			if len(batch) >= LINES_BATCH_SIZE:
+				for line in pool.map(combined_encoder.encode, batch):
+					yield line
+					yield '\n'
+				batch = []
+		for line in pool.map(combined_encoder.encode, batch):
+			yield line
+			yield '\n'
+
+
+def _write_chunk(fh, data):
+	"""
+	Write to the file handle; only errors from writing get the hint about binary mode, not those from encoding.
+	"""
+	try:
+		fh.write(data)
+	except TypeError as err:
+		err.args = (err.args[0] + '. A possible reason is that the file is not opened in binary mode; '
+			'be sure to set file mode to something like "wb".',)
+		raise
+
+
+def _is_binary_handle(fh):
+	try:
+		fh.write(b'')
+	except TypeError:
+		return False
+	try:
+		fh.write(u'')
+	except TypeError:
+		return True
+	return False
+
+
+def _join_chunks(chunks, size=CHUNK_SIZE):
+	"""
+	Combine the many small strings from `iterencode` into chunks of at least `size` characters, to reduce write calls.
+	"""
+	buffer, length = [], 0
+	for chunk in chunks:
+		buffer.append(chunk)
+		length += len(chunk)
+		if length >= size:
+			yield ''.join(buffer)
+			buffer, length = [], 0
+	if buffer:
+		yield ''.join(buffer)
 
 
 def loads(string, preserve_order=True, ignore_comments=None, decompression=None, obj_pairs_hooks=DEFAULT_HOOKS,
@@ -204,8 +325,8 @@ def loads(string, preserve_order=True, ignore_comments=None, decompression=None,
 	:param string: The string containing a json encoded data structure.
 	:param decode_cls_instances: True to attempt to decode class instances (requires the environment to be similar the the encoding one).
 	:param preserve_order: Whether to preserve order by using OrderedDicts or not.
-	:param ignore_comments: Remove comments (starting with # or //). By default (`None`), try without comments first, and re-try with comments upon failure.
-	:param decompression: True to use gzip decompression, False to use raw data, None to automatically determine (default). Assumes utf-8 encoding!
+	:param ignore_comments: Remove comments (starting with # or //). By default (`None`), comments are removed if the string contains any.
+	:param decompression: True to use gzip decompression, the name of another compression format, False to use raw data, or None to automatically determine (default). Assumes utf-8 encoding!
 	:param obj_pairs_hooks: A list of dictionary hooks to apply.
 	:param extra_obj_pairs_hooks: Like `obj_pairs_hooks` but on top of them: use this to add hooks without replacing defaults. Since v3.5 these happen before default hooks.
 	:param cls_lookup_map: If set to a dict, for example ``globals()``, then classes encoded from __main__ are looked up this dict.
@@ -218,10 +339,31 @@ def loads(string, preserve_order=True, ignore_comments=None, decompression=None,
 	"""
 	if not hasattr(extra_obj_pairs_hooks, '__iter__'):
 		raise TypeError('`extra_obj_pairs_hooks` should be a tuple in `json_tricks.load(s)`')
+	string, decompression = _decode_input(string, decompression, conv_str_byte)
+	hook = _make_hook(preserve_order=preserve_order, ignore_comments=ignore_comments, decompression=decompression,
+		obj_pairs_hooks=obj_pairs_hooks, extra_obj_pairs_hooks=extra_obj_pairs_hooks, cls_lookup_map=cls_lookup_map,
+		allow_duplicates=allow_duplicates, properties=properties)
+	return _loads_with_hook(string, hook, ignore_comments, jsonkwargs)
+
+
+def _get_decompression(decompression, head):
+	"""
+	Get the `CompressionCodec` to decompress data that starts with `head`, or None if it is not compressed.
+	"""
 	if decompression is None:
-		decompression = isinstance(string, bytes) and string[:2] == b'\x1f\x8b'
-	if decompression:
-		string = gzip_decompress(string).decode(ENCODING)
+		return detect_compression(head)
+	if decompression is True:
+		return COMPRESSION_CODECS['gzip']
+	if not decompression:
+		return None
+	return resolve_compression(decompression)[0]
+
+
+def _decode_input(string, decompression, conv_str_byte):
+	codec = _get_decompression(decompression, string[:8])
+	decompression = codec is not None
+	if codec is not None:
+		string = codec.decompress(string).decode(ENCODING)
 	if not isinstance(string, str_type):
 		if conv_str_byte:
 			string = string.decode(ENCODING)
@@ -232,6 +374,11 @@ def loads(string, preserve_order=True, ignore_comments=None, decompression=None,
 				'for example bytevar.encode("utf-8") if utf-8 is the encoding. Alternatively you can '
 				'force an attempt by passing conv_str_byte=True, but this may cause decoding issues.')
 					.format(type(string)))
+	return string, decompression
+
+
+def _make_hook(preserve_order, ignore_comments, decompression, obj_pairs_hooks, extra_obj_pairs_hooks,
+		cls_lookup_map, allow_duplicates, properties):
 	properties = properties or {}
 	dict_default(properties, 'preserve_order', preserve_order)
 	dict_default(properties, 'ignore_comments', ignore_comments)
@@ -239,22 +386,23 @@ def loads(string, preserve_order=True, ignore_comments=None, decompression=None,
 	dict_default(properties, 'cls_lookup_map', cls_lookup_map)
 	dict_default(properties, 'allow_duplicates', allow_duplicates)
 	hooks = tuple(extra_obj_pairs_hooks) + tuple(obj_pairs_hooks)
-	hook = TricksPairHook(ordered=preserve_order, obj_pairs_hooks=hooks, allow_duplicates=allow_duplicates, properties=properties)
+	return TricksPairHook(ordered=preserve_order, obj_pairs_hooks=hooks, allow_duplicates=allow_duplicates, properties=properties)
+
+
+def _loads_with_hook(string, hook, ignore_comments, jsonkwargs):
 	if ignore_comments is None:
-		try:
-			# first try to parse without stripping comments
+		# scan for comments instead of trying to parse first, so that the string is only parsed once
+		if not has_comments(string):
 			return _strip_loads(string, hook, False, **jsonkwargs)
-		except ValueError:
-			# if this fails, re-try parsing after stripping comments
-			result = _strip_loads(string, hook, True, **jsonkwargs)
-			if not getattr(loads, '_ignore_comments_warned', False):
-				warnings.warn('`json_tricks.load(s)` stripped some comments, but `ignore_comments` was '
-					'not passed; in the next major release, the behaviour when `ignore_comments` is not '
-					'passed will change; it is recommended to explicitly pass `ignore_comments=True` if '
-					'you want to strip comments; see https://github.com/mverleg/pyjson_tricks/issues/74',
-					JsonTricksDeprecation)
-				loads._ignore_comments_warned = True
-			return result
+		result = _strip_loads(string, hook, True, **jsonkwargs)
+		if not getattr(loads, '_ignore_comments_warned', False):
+			warnings.warn('`json_tricks.load(s)` stripped some comments, but `ignore_comments` was '
+				'not passed; in the next major release, the behaviour when `ignore_comments` is not '
+				'passed will change; it is recommended to explicitly pass `ignore_comments=True` if '
+				'you want to strip comments; see https://github.com/mverleg/pyjson_tricks/issues/74',
+				JsonTricksDeprecation)
+			loads._ignore_comments_warned = True
+		return result
 	if ignore_comments:
 		return _strip_loads(string, hook, True, **jsonkwargs)
 	return _strip_loads(string, hook, False, **jsonkwargs)
@@ -276,25 +424,303 @@ def load(fp, preserve_order=True, ignore_comments=None, decompression=None, obj_
 
 	The other arguments are identical to loads.
 	"""
+	string = _read_file(fp, decompression)
+	return loads(string, preserve_order=preserve_order, ignore_comments=ignore_comments, decompression=decompression,
+		obj_pairs_hooks=obj_pairs_hooks, extra_obj_pairs_hooks=extra_obj_pairs_hooks, cls_lookup_map=cls_lookup_map,
+		allow_duplicates=allow_duplicates, conv_str_byte=conv_str_byte, properties=properties, **jsonkwargs)
+
+
+def _read_file(fp, decompression):
 	try:
 		if isinstance(fp, str_type):
 			if decompression is not None:
 				open_binary = bool(decompression)
 			else:
 				with open(fp, 'rb') as fh:
-					# This attempts to detect gzip mode; gzip should always
-					# have this header, and text json can't have it.
-					open_binary = (fh.read(2) == b'\x1f\x8b')
+					# This attempts to detect compression; compressed formats have a
+					# header that text json can't have.
+					open_binary = detect_compression(fh.read(8)) is not None
 			with open(fp, 'rb' if open_binary else 'r') as fh:
-				string = fh.read()
+				return fh.read()
 		else:
-			string = fp.read()
+			return fp.read()
 	except UnicodeDecodeError as err:
 		# todo: not covered in tests, is it relevant?
 		raise Exception('There was a problem decoding the file content. A possible reason is that the file is not ' +
 			'opened  in binary mode; be sure to set file mode to something like "rb".').with_traceback(exc_info()[2])
-	return loads(string, preserve_order=preserve_order, ignore_comments=ignore_comments, decompression=decompression,
+
+
+def iterload(fp, preserve_order=True, decompression=None, lines=None, obj_pairs_hooks=DEFAULT_HOOKS,
+		extra_obj_pairs_hooks=(), cls_lookup_map=None, allow_duplicates=True, conv_str_byte=False,
+		properties=None, chunk_size=CHUNK_SIZE, **jsonkwargs):
+	"""
+	Iterate over the elements of a top-level json array, or over the records of a JSON Lines file, decoding
+	them one at a time. The file is read in chunks, so it does not need to fit in memory.
+
+	:param fp: File handle or path to load from.
+	:param lines: True for JSON Lines (json values separated by whitespace, usually one per line), False for
+		a top-level array. By default (`None`), use array mode if the first character is `[`.
+	:param chunk_size: The number of characters or bytes to read at once.
+
+	The other arguments are identical to `loads`, but comments are not supported.
+	"""
+	if not hasattr(extra_obj_pairs_hooks, '__iter__'):
+		raise TypeError('`extra_obj_pairs_hooks` should be a tuple in `json_tricks.iterload`')
+	hook = _make_hook(preserve_order=preserve_order, ignore_comments=False, decompression=decompression,
 		obj_pairs_hooks=obj_pairs_hooks, extra_obj_pairs_hooks=extra_obj_pairs_hooks, cls_lookup_map=cls_lookup_map,
-		allow_duplicates=allow_duplicates, conv_str_byte=conv_str_byte, properties=properties, **jsonkwargs)
+		allow_duplicates=allow_duplicates, properties=properties)
+	decoder = JSONDecoder(object_pairs_hook=hook, **jsonkwargs)
+	return _iterload_with_decoder(fp, decoder, decompression=decompression, lines=lines,
+		conv_str_byte=conv_str_byte, chunk_size=chunk_size)
+
+
+def _iterload_with_decoder(fp, decoder, decompression, lines, conv_str_byte, chunk_size):
+	if isinstance(fp, str_type):
+		with open(fp, 'rb') as fh:
+			for value in _iter_values(_iter_text_chunks(fh, decompression, True, chunk_size), decoder, lines):
+				yield value
+	else:
+		for value in _iter_values(_iter_text_chunks(fp, decompression, conv_str_byte, chunk_size), decoder, lines):
+			yield value
+
 
+def _iter_text_chunks(fh, decompression, conv_str_byte, chunk_size):
+	"""
+	Read a file handle in chunks, decompressing and decoding them to text if needed.
+	"""
+	first = fh.read(chunk_size)
+	if not first:
+		return
+	if isinstance(first, str_type):
+		if decompression:
+			raise IOError('If decompression is enabled, the file must be opened in binary mode.')
+		yield first
+		for chunk in iter(lambda: fh.read(chunk_size), ''):
+			yield chunk
+		return
+	chunks = _prepend(first, iter(lambda: fh.read(chunk_size), b''))
+	codec = _get_decompression(decompression, first[:8])
+	if codec is not None:
+		chunks = codec.iter_decompress(chunks, chunk_size)
+	elif not conv_str_byte:
+		raise TypeError('The file handle returned bytes in `json_tricks.iterload`, but bytes cannot be automatically '
+			'decoded since the encoding is not known. Open the file in text mode, or force an attempt to decode '
+			'as {0:s} by passing conv_str_byte=True.'.format(ENCODING))
+	decoder = getincrementaldecoder(ENCODING)()
+	for chunk in chunks:
+		text = decoder.decode(chunk)
+		if text:
+			yield text
+	text = decoder.decode(b'', True)
+	if text:
+		yield text
+
+
+def _prepend(first, iterator):
+	yield first
+	for item in iterator:
+		yield item
+
+
+class _ChunkBuffer(object):
+	"""
+	Text buffer that reads more chunks when needed, and only keeps the part that has not been processed.
+	"""
+	def __init__(self, chunks):
+		self.chunks = chunks
+		self.text = ''
+		self.pos = 0
+		self.eof = False
+
+	def fill(self, min_size):
+		"""
+		Read until at least `min_size` unprocessed characters are available, or the input ends.
+		"""
+		parts = [self.text[self.pos:]]
+		length = len(parts[0])
+		while length < min_size and not self.eof:
+			try:
+				chunk = next(self.chunks)
+			except StopIteration:
+				self.eof = True
+			else:
+				parts.append(chunk)
+				length += len(chunk)
+		self.text = ''.join(parts)
+		self.pos = 0
+
+	def skip_whitespace(self):
+		"""
+		Move to the next non-whitespace character and return it, or None at the end of the input.
+		"""
+		while True:
+			self.pos = _WHITESPACE.match(self.text, self.pos).end()
+			if self.pos < len(self.text):
+				return self.text[self.pos]
+			if self.eof:
+				return None
+			self.fill(1)
+
+	def decode(self, decoder, lines=False):
+		"""
+		Decode the json value at the current position, reading more input as long as it may be incomplete.
+		"""
+		while True:
+			try:
+				value, end = decoder.raw_decode(self.text, self.pos)
+			except ValueError as err:
+				if self.eof or not self.may_be_incomplete(err, lines and getattr(decoder, 'strict', True)):
+					raise
+			else:
+				# a value at the end of the buffer may continue, e.g. a number followed by '.' or 'e+'
+				if end + 2 < len(self.text) or self.eof:
+					self.pos = end
+					return value
+			# at least double the buffer so that large values are not re-parsed too often
+			remaining = len(self.text) - self.pos
+			self.fill(2 * remaining + 1)
+
+
+	def may_be_incomplete(self, err, single_lines):
+		"""
+		Whether a decoding error may be caused by the end of the buffer, rather than by invalid json. If
+		`single_lines`, values cannot contain newlines, so an error before a newline is always final.
+		"""
+		pos = getattr(err, 'pos', None)
+		if pos is None:
+			return False
+		if single_lines and self.text.find('\n', pos) >= 0:
+			return False
+		if getattr(err, 'msg', '').startswith('Unterminated string'):
+			return True
+		# errors are reported at the start of a token, which may be cut off, e.g. '-Infin'
+		return pos + _MAX_PARTIAL_TOKEN >= len(self.text.rstrip(' \t\n\r'))
+
+
+def _iter_values(chunks, decoder, lines):
+	buffer = _ChunkBuffer(chunks)
+	char = buffer.skip_whitespace()
+	if char is None:
+		return
+	if lines is None:
+		lines = char != '['
+	if lines:
+		while char is not None:
+			yield buffer.decode(decoder, lines=True)
+			char = buffer.skip_whitespace()
+		return
+	if char != '[':
+		raise ValueError('Expected a top-level json array in `json_tricks.iterload`, but found "{0:s}"; '
+			'pass lines=True for JSON Lines'.format(char))
+	buffer.pos += 1
+	char = buffer.skip_whitespace()
+	while char != ']':
+		if char is None:
+			raise ValueError('Unexpected end of input inside the top-level json array in `json_tricks.iterload`')
+		yield buffer.decode(decoder)
+		char = buffer.skip_whitespace()
+		if char == ',':
+			buffer.pos += 1
+			char = buffer.skip_whitespace()
+			if char == ']':
+				raise ValueError('Unexpected "]" after "," in the top-level json array in `json_tricks.iterload`')
+		elif char != ']' and char is not None:
+			raise ValueError('Expected "," or "]" in the top-level json array in `json_tricks.iterload`, '
+				'but found "{0:s}"'.format(char))
+	buffer.pos += 1
+	if buffer.skip_whitespace() is not None:
+		raise ValueError('Found extra data after the top-level json array in `json_tricks.iterload`')
+
+
+def load_lines(fp, preserve_order=True, decompression=None, obj_pairs_hooks=DEFAULT_HOOKS,
+		extra_obj_pairs_hooks=(), cls_lookup_map=None, allow_duplicates=True, conv_str_byte=False,
+		properties=None, chunk_size=CHUNK_SIZE, **jsonkwargs):
+	"""
+	Iterate over the records of a JSON Lines file, as written by `dump_lines`. This is `iterload` with `lines=True`.
+	"""
+	return iterload(fp, preserve_order=preserve_order, decompression=decompression, lines=True,
+		obj_pairs_hooks=obj_pairs_hooks, extra_obj_pairs_hooks=extra_obj_pairs_hooks, cls_lookup_map=cls_lookup_map,
+		allow_duplicates=allow_duplicates, conv_str_byte=conv_str_byte, properties=properties,
+		chunk_size=chunk_size, **jsonkwargs)
+
+
+class Codec(object):
+	"""
+	Encoder and hooks that are set up once, to `dump(s)` and `load(s)` many times with the same settings.
+	This is faster than repeatedly calling the module-level functions, which configure everything on each call.
+
+	The arguments are the same as those of `dumps` and `loads`. Extra keyword arguments for the json encoder
+	(like `indent`) go in `dumps_kwargs`, and those for the json decoder (like `parse_float`) in `loads_kwargs`.
+	"""
+	def __init__(self, sort_keys=None, cls=None, obj_encoders=DEFAULT_ENCODERS, extra_obj_encoders=(),
+			primitives=False, compression=None, allow_nan=False, conv_str_byte=False, fallback_encoders=(),
+			preserve_order=True, ignore_comments=None, decompression=None, obj_pairs_hooks=DEFAULT_HOOKS,
+			extra_obj_pairs_hooks=(), cls_lookup_map=None, allow_duplicates=True, properties=None,
+			dumps_kwargs=None, loads_kwargs=None):
+		if not hasattr(extra_obj_pairs_hooks, '__iter__'):
+			raise TypeError('`extra_obj_pairs_hooks` should be a tuple in `json_tricks.Codec`')
+		self.compression = compression
+		self.conv_str_byte = conv_str_byte
+		self.ignore_comments = ignore_comments
+		self.decompression = decompression
+		self.loads_kwargs = dict(loads_kwargs or {})
+		self.encoder = _make_encoder(sort_keys=sort_keys, cls=cls, obj_encoders=obj_encoders,
+			extra_obj_encoders=extra_obj_encoders, primitives=primitives, compression=compression,
+			allow_nan=allow_nan, fallback_encoders=fallback_encoders, properties=dict(properties or {}),
+			jsonkwargs=dict(dumps_kwargs or {}))
+		self.hook = _make_hook(preserve_order=preserve_order, ignore_comments=ignore_comments,
+			decompression=decompression, obj_pairs_hooks=obj_pairs_hooks, extra_obj_pairs_hooks=extra_obj_pairs_hooks,
+			cls_lookup_map=cls_lookup_map, allow_duplicates=allow_duplicates, properties=dict(properties or {}))
+
+	def dumps(self, obj):
+		"""
+		Convert a nested data structure to a json string, like `json_tricks.dumps`.
+		"""
+		return _encode(self.encoder, obj, self.compression)
+
+	def dump(self, obj, fp, force_flush=False, stream=False):
+		"""
+		Write a nested data structure to a file handle or path, like `json_tricks.dump`.
+		"""
+		_check_dump_arg_order(obj, fp)
+		if stream:
+			_stream_file(self.encoder.iterencode(obj), fp, compression=self.compression, force_flush=force_flush,
+				conv_str_byte=self.conv_str_byte)
+			return None
+		txt = _encode(self.encoder, obj, self.compression)
+		_write_file(txt, fp, compression=self.compression, force_flush=force_flush, conv_str_byte=self.conv_str_byte)
+		return txt
 
+	def dump_lines(self, records, fp, append=False, force_flush=False, threads=None):
+		"""
+		Write an iterable of records as JSON Lines, like `json_tricks.dump_lines`.
+		"""
+		_stream_file(_encode_lines(self.encoder, records, threads), fp, compression=self.compression,
+			force_flush=force_flush, conv_str_byte=self.conv_str_byte, append=append)
+
+	def loads(self, string):
+		"""
+		Convert a json string to a nested data structure, like `json_tricks.loads`.
+		"""
+		string, _ = _decode_input(string, self.decompression, self.conv_str_byte)
+		return _loads_with_hook(string, self.hook.new_document(), self.ignore_comments, self.loads_kwargs)
+
+	def load(self, fp):
+		"""
+		Read a nested data structure from a file handle or path, like `json_tricks.load`.
+		"""
+		return self.loads(_read_file(fp, self.decompression))
+
+	def iterload(self, fp, lines=None, chunk_size=CHUNK_SIZE):
+		"""
+		Iterate over the elements of a top-level array or JSON Lines file, like `json_tricks.iterload`.
+		"""
+		decoder = JSONDecoder(object_pairs_hook=self.hook.new_document(), **self.loads_kwargs)
+		return _iterload_with_decoder(fp, decoder, decompression=self.decompression, lines=lines,
+			conv_str_byte=self.conv_str_byte, chunk_size=chunk_size)
+
+	def load_lines(self, fp, chunk_size=CHUNK_SIZE):
+		"""
+		Iterate over the records of a JSON Lines file, like `json_tricks.load_lines`.
+		"""
+		return self.iterload(fp, lines=True, chunk_size=chunk_size)
@@ -0,0 +1,115 @@
+"""
+Optional statistics about the encoders and hooks, to find out which ones take time.
+"""
+
+from collections import OrderedDict
+try:
+	from time import perf_counter
+except ImportError:
+	from time import time as perf_counter
+
+
+class CallStats(object):
+	"""
+	The number of calls, the number of calls that changed the object ('hits'), and the total time in seconds,
+	for one encoder or hook.
+	"""
+	__slots__ = ('name', 'calls', 'hits', 'time')
+
+	def __init__(self, name):
+		self.name = name
+		self.calls = 0
+		self.hits = 0
+		self.time = 0.
+
+	def __repr__(self):
+		return '{0:s}({1:s}: calls={2:d}, hits={3:d}, time={4:.6f})'.format(
+			self.__class__.__name__, self.name, self.calls, self.hits, self.time)
+
+
+class TricksStats(object):
+	"""
+	Collects statistics for each encoder and hook, when passed as property, e.g.
+	`dumps(data, properties={'stats': stats})`. Statistics are added up over all calls that use the same object.
+
+	:ivar encoders: An ordered map from encoder name to `CallStats`.
+	:ivar hooks: An ordered map from hook name to `CallStats`.
+	:ivar output_size: The total number of characters of json produced (before compression).
+	"""
+	def __init__(self):
+		self.encoders = OrderedDict()
+		self.hooks = OrderedDict()
+		self.output_size = 0
+
+	def reset(self):
+		"""
+		Set all counts to zero. The encoders and hooks stay listed, since e.g. a `Codec` keeps recording to them.
+		"""
+		for stat in list(self.encoders.values()) + list(self.hooks.values()):
+			stat.calls = stat.hits = 0
+			stat.time = 0.
+		self.output_size = 0
+
+	def wrap_encoder(self, encoder, wrapped):
+		"""
+		Wrap the (filtered) `wrapped` version of `encoder` so that its calls are recorded.
+		"""
+		return _timed(wrapped, _get_call_stats(self.encoders, encoder))
+
+	def wrap_hook(self, hook, wrapped):
+		return _timed(wrapped, _get_call_stats(self.hooks, hook))
+
+	def count_output(self, chunks):
+		for chunk in chunks:
+			self.output_size += len(chunk)
+			yield chunk
+
+	def as_dict(self):
+		return OrderedDict((
+			('encoders', [OrderedDict((name, getattr(stat, name)) for name in CallStats.__slots__)
+				for stat in self.encoders.values()]),
+			('hooks', [OrderedDict((name, getattr(stat, name)) for name in CallStats.__slots__)
+				for stat in self.hooks.values()]),
+			('output_size', self.output_size),
+		))
+
+	def __str__(self):
+		rows = [('', 'calls', 'hits', 'time ms')]
+		for title, stats in (('encoders', self.encoders), ('hooks', self.hooks)):
+			if not stats:
+				continue
+			rows.append((title + ':', '', '', ''))
+			for stat in sorted(stats.values(), key=lambda stat: -stat.time):
+				rows.append(('  ' + stat.name, str(stat.calls), str(stat.hits), '{0:.2f}'.format(1000 * stat.time)))
+		widths = [max(len(row[k]) for row in rows) for k in range(4)]
+		lines = ['  '.join([row[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])])
+			for row in rows]
+		lines.append('output size: {0:d}'.format(self.output_size))
+		return '\n'.join(lines)
+
+
+def get_callable_name(func):
+	name = getattr(func, '__name__', None) or func.__class__.__name__
+	module = getattr(func, '__module__', None) or func.__class__.__module__
+	if module and not module.startswith('json_tricks'):
+		name = '{0:s}.{1:s}'.format(module, name)
+	return name
+
+
+def _get_call_stats(stats, func):
+	name = get_callable_name(func)
+	if name not in stats:
+		stats[name] = CallStats(name)
+	return stats[name]
+
+
+def _timed(func, call_stats):
+	def timed(obj, **kwargs):
+		start = perf_counter()
+		result = func(obj, **kwargs)
+		call_stats.time += perf_counter() - start
+		call_stats.calls += 1
+		if result is not obj:
+			call_stats.hits += 1
+		return result
+	return timed
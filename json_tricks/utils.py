@@ -4,7 +4,7 @@ import warnings
 from collections import OrderedDict
 from functools import partial
 from importlib import import_module
-from sys import version_info, version
+from sys import version_info, version, modules
 
 
 class JsonTricksDeprecation(UserWarning):
@@ -52,21 +52,144 @@ else:
 		return set(sig.parameters.keys())
 
 
-def filtered_wrapper(encoder):
+_ARG_NAMES_CACHE_SIZE = 512
+_arg_names_cache = {}
+_filtered_caller_factories = {}
+
+
+def get_cached_arg_names(callable):
+	"""
+	Like `get_arg_names`, but remembers the result for (hashable) callables, since introspection is slow.
+	"""
+	try:
+		return _arg_names_cache[callable]
+	except KeyError:
+		pass
+	except TypeError:
+		return get_arg_names(callable)
+	names = frozenset(get_arg_names(callable))
+	if len(_arg_names_cache) >= _ARG_NAMES_CACHE_SIZE:
+		_arg_names_cache.clear()
+	_arg_names_cache[callable] = names
+	return names
+
+
+def _get_filtered_caller_factory(kwarg_names, accepted):
+	"""
+	Generate a function that wraps a callable, such that it can be called with all of `kwarg_names`
+	but only receives the `accepted` ones. There are few combinations, so the generated code is cached.
+	"""
+	key = (kwarg_names, accepted)
+	if key not in _filtered_caller_factories:
+		source = 'def make_wrapper(func):\n\tdef wrapper(obj, {0:s}):\n\t\treturn func(obj, {1:s})\n\treturn wrapper\n'.format(
+			', '.join(kwarg_names), ', '.join('{0:s}={0:s}'.format(name) for name in accepted))
+		namespace = {}
+		exec(source, namespace)
+		_filtered_caller_factories[key] = namespace['make_wrapper']
+	return _filtered_caller_factories[key]
+
+
+def filtered_wrapper(encoder, kwarg_names=None):
 	"""
 	Filter kwargs passed to encoder.
+
+	:param kwarg_names: If the caller always passes the same keyword arguments, pass their names here. This
+		makes the returned wrapper require exactly those, and it avoids filtering the arguments for every call.
 	"""
 	if hasattr(encoder, "default"):
 		encoder = encoder.default
 	elif not hasattr(encoder, '__call__'):
-		raise TypeError('`obj_encoder` {0:} does not have `default` method and is not callable'.format(enc))
-	names = get_arg_names(encoder)
+		raise TypeError('`obj_encoder` {0:} does not have `default` method and is not callable'.format(encoder))
+	names = get_cached_arg_names(encoder)
+	if kwarg_names is not None:
+		kwarg_names = tuple(kwarg_names)
+		accepted = tuple(name for name in kwarg_names if name in names)
+		return _get_filtered_caller_factory(kwarg_names, accepted)(encoder)
 
 	def wrapper(*args, **kwargs):
 		return encoder(*args, **{k: v for k, v in kwargs.items() if k in names})
 	return wrapper
 
 
+def encodes_types(*types):
+	"""
+	Decorator to declare which types an encoder can change. `TricksEncoder` skips the encoder for objects
+	that are not instances of one of these types. Encoders without declaration are run for every object.
+
+	Types can be classes, or 'module.Name' strings for optional dependencies, which are imported when first needed.
+	"""
+	def decorator(encoder):
+		encoder.encodes_types = types
+		return encoder
+	return decorator
+
+
+def get_encoder_types(encoder):
+	"""
+	Get the tuple of types declared by `encodes_types`, or None if the encoder should run for any type.
+	Types given as 'module.Name' strings are returned as (module, name) tuples, see `matches_encoder_types`.
+	"""
+	types = getattr(encoder, 'encodes_types', None)
+	if types is None:
+		return None
+	return tuple(tuple(tp.rsplit('.', 1)) if isinstance(tp, str_type) else tp for tp in types)
+
+
+def matches_encoder_types(obj_type, types):
+	"""
+	Check whether `obj_type` is a subclass of any of the types from `get_encoder_types`.
+
+	Types from a module that has not been imported cannot match, so the module is not imported here. This keeps
+	optional dependencies like pandas from being imported until an object from them is actually encountered.
+	"""
+	if types is None:
+		return True
+	for tp in types:
+		if isinstance(tp, tuple):
+			module = modules.get(tp[0])
+			if module is None:
+				continue
+			try:
+				tp = getattr(module, tp[1])
+			except AttributeError:
+				# cannot tell which objects the encoder handles, so be safe and always run it
+				return True
+		if issubclass(obj_type, tp):
+			return True
+	return False
+
+
+def is_module_available(name):
+	"""
+	Check whether a module can be imported, without importing it if possible (which is slow for e.g. pandas).
+	"""
+	if name in modules:
+		return True
+	try:
+		from importlib.util import find_spec
+	except ImportError:
+		try:
+			import_module(name)
+		except ImportError:
+			return False
+		return True
+	try:
+		return find_spec(name) is not None
+	except (ImportError, ValueError):
+		return False
+
+
+def decodes_keys(*keys):
+	"""
+	Decorator to declare the marker keys of the maps that a hook can change. `TricksPairHook` skips the hook
+	for maps that contain none of these keys. Hooks without declaration are run for every map.
+	"""
+	def decorator(hook):
+		hook.decodes_keys = keys
+		return hook
+	return decorator
+
+
 class NoNumpyException(Exception):
 	""" Trying to use numpy features, but numpy cannot be found. """
 
@@ -83,38 +206,68 @@ class NoPathlibException(Exception):
 	""" Trying to use pathlib features, but pathlib cannot be found. """
 
 
+_CLS_LOOKUP_CACHE_SIZE = 1024
+_cls_lookup_cache = {}
+
+
+def clear_class_lookup_cache():
+	"""
+	Forget the classes that were found (or not found) by importing while decoding instances and enums. This is
+	needed if a class changed after it was first decoded, e.g. when reloading a module or redefining a class
+	in `__main__`, or when a module that could not be imported before has become available.
+	"""
+	_cls_lookup_cache.clear()
+
+
+def _cache_cls(key, Cls):
+	if len(_cls_lookup_cache) >= _CLS_LOOKUP_CACHE_SIZE:
+		_cls_lookup_cache.clear()
+	_cls_lookup_cache[key] = Cls
+	return Cls
+
+
 class ClassInstanceHookBase(object):
 	def get_cls_from_instance_type(self, mod, name, cls_lookup_map):
-		Cls = ValueError()
-		if mod is None:
-			try:
-				Cls = getattr((__import__('__main__')), name)
-			except (ImportError, AttributeError):
-				if name not in cls_lookup_map:
-					raise ImportError(('class {0:s} seems to have been exported from the main file, which means '
-						'it has no module/import path set; you need to provide loads argument'
-						'`cls_lookup_map={{"{0}": Class}}` to locate the class').format(name))
-				Cls = cls_lookup_map[name]
-		else:
-			imp_err = None
-			try:
-				module = import_module('{0:}'.format(mod, name))
-			except ImportError as err:
-				imp_err = ('encountered import error "{0:}" while importing "{1:}" to decode a json file; perhaps '
-					'it was encoded in a different environment where {1:}.{2:} was available').format(err, mod, name)
-			else:
-				if hasattr(module, name):
-					Cls = getattr(module, name)
-				else:
-					imp_err = 'imported "{0:}" but could find "{1:}" inside while decoding a json file (found {2:})'.format(
-						module, name, ', '.join(attr for attr in dir(module) if not attr.startswith('_')))
-			if imp_err:
-				Cls = cls_lookup_map.get(name, None)
-				if Cls is None:
-					raise ImportError('{}; add the class to `cls_lookup_map={{"{}": Class}}` argument'.format(imp_err, name))
+		"""
+		Find the class by importing `mod`, or else in `cls_lookup_map`. Imported classes are cached, and so are
+		failed imports, so that later instances go straight to `cls_lookup_map`.
+		"""
+		try:
+			Cls = _cls_lookup_cache[(mod, name)]
+		except KeyError:
+			Cls = _cache_cls((mod, name), _import_cls(mod, name))
+		if isinstance(Cls, ImportError):
+			found = cls_lookup_map.get(name, None)
+			if found is None:
+				raise ImportError(str(Cls))
+			return found
 		return Cls
 
 
+def _import_cls(mod, name):
+	"""
+	Import the class, or return (rather than raise) an `ImportError` that explains why it could not be found.
+	"""
+	if mod is None:
+		try:
+			return getattr((__import__('__main__')), name)
+		except (ImportError, AttributeError):
+			return ImportError(('class {0:s} seems to have been exported from the main file, which means '
+				'it has no module/import path set; you need to provide loads argument'
+				'`cls_lookup_map={{"{0}": Class}}` to locate the class').format(name))
+	try:
+		module = import_module('{0:}'.format(mod, name))
+	except ImportError as err:
+		imp_err = ('encountered import error "{0:}" while importing "{1:}" to decode a json file; perhaps '
+			'it was encoded in a different environment where {1:}.{2:} was available').format(err, mod, name)
+	else:
+		if hasattr(module, name):
+			return getattr(module, name)
+		imp_err = 'imported "{0:}" but could find "{1:}" inside while decoding a json file (found {2:})'.format(
+			module, name, ', '.join(attr for attr in dir(module) if not attr.startswith('_')))
+	return ImportError('{}; add the class to `cls_lookup_map={{"{}": Class}}` argument'.format(imp_err, name))
+
+
 def get_scalar_repr(npscalar):
 	return hashodict((
 		('__ndarray__', npscalar.item()),
@@ -6,7 +6,9 @@ from datetime import datetime, time, date, timedelta
 from decimal import Decimal
 from fractions import Fraction
 from functools import partial
+from importlib import import_module
 from io import BytesIO, StringIO
+from json import loads as json_loads
 from math import pi, exp
 from os.path import join
 from tempfile import mkdtemp
@@ -15,9 +17,12 @@ from warnings import catch_warnings, simplefilter
 import pytest
 from pytest import raises, fail, warns
 
-from json_tricks import fallback_ignore_unknown, DuplicateJsonKeyException
-from json_tricks.nonp import strip_comments, dump, dumps, load, loads, \
-	ENCODING
+from json_tricks import fallback_ignore_unknown, DuplicateJsonKeyException, encodes_types, decodes_keys, Codec, \
+	clear_class_lookup_cache, TricksStats
+from json_tricks.comment import has_comments
+from json_tricks.nonp import strip_comments, dump, dumps, load, loads, iterload, \
+	dump_lines, load_lines, ENCODING
+from json_tricks.compression import COMPRESSION_CODECS, get_compression
 from json_tricks.utils import is_py3, gzip_compress, JsonTricksDeprecation, str_type
 from .test_class import MyTestCls, CustomEncodeCls, SubClass, SuperClass, SlotsBase, SlotsDictABC, SlotsStr, \
 	SlotsABCDict, SlotsABC
@@ -129,6 +134,127 @@ def test_file_path():
 	assert data3 == nonpdata
 
 
+def test_stats():
+	stats = TricksStats()
+	data = [datetime(2020, 1, 2), Decimal('1.5'), Decimal('2.5'), {'a': [1, 2]}]
+	txt = dumps(data, properties={'stats': stats})
+	assert stats.encoders['numeric_types_encode'].calls == 2
+	assert stats.encoders['numeric_types_encode'].hits == 2
+	assert stats.encoders['json_date_time_encode'].hits == 1
+	assert stats.encoders['json_set_encode'].calls == 0
+	assert stats.encoders['class_instance_encode'].hits == 0
+	assert stats.output_size == len(txt)
+	assert loads(txt, properties={'stats': stats}) == data
+	assert stats.hooks['numeric_types_hook'].hits == 2
+	assert stats.hooks['json_date_time_hook'].calls == 1
+	assert stats.hooks['json_set_hook'].calls == 0
+	assert 'numeric_types_hook' in str(stats)
+	def to_str(obj):
+		return str(obj)
+	codec = Codec(extra_obj_encoders=(to_str,), properties={'stats': stats})
+	stats.reset()
+	assert stats.encoders['numeric_types_encode'].calls == 0
+	codec.dumps([MyTestCls()])
+	codec.dumps([MyTestCls()])
+	name = '{0:s}.to_str'.format(__name__)
+	assert stats.encoders[name].calls == 2
+	assert stats.encoders[name].hits == 2
+	assert stats.as_dict()['output_size'] == stats.output_size > 0
+
+
+def test_dump_streams_chunks():
+	class RecordingStringIO(StringIO):
+		def __init__(self):
+			super(RecordingStringIO, self).__init__()
+			self.sizes = []
+		def write(self, txt):
+			self.sizes.append(len(txt))
+			return super(RecordingStringIO, self).write(txt)
+	data = [dict(nonpdata, nr=nr) for nr in range(1000)]
+	with RecordingStringIO() as fh:
+		assert dump(data, fh, stream=True) is None
+		assert len(fh.sizes) > 1
+		assert max(fh.sizes) < len(dumps(data))
+		assert fh.getvalue() == dumps(data)
+	with BytesIO() as fh:
+		dump(data, fh, compression=True, stream=True)
+		assert fh.getvalue() == dumps(data, compression=True)
+		fh.seek(0)
+		assert load(fh) == data
+	with RecordingStringIO() as fh:
+		assert dump(data, fh) == dumps(data)
+		assert fh.sizes == [len(dumps(data))]
+	with BytesIO() as fh:
+		assert dump(data, fh, compression=True) == fh.getvalue() == dumps(data, compression=True)
+
+
+def test_iterload():
+	data = [dict(nonpdata, nr=nr, when=datetime(2020, 1, 2, 3, 4, nr % 60)) for nr in range(300)] + \
+		[1234567, 'text', None, [1, [2]], Decimal('3.14')]
+	assert list(iterload(StringIO(dumps(data)), chunk_size=7)) == data
+	assert list(iterload(StringIO(dumps(data, indent=2)), chunk_size=64)) == data
+	json_lines = '\n'.join(dumps(record) for record in data) + '\n'
+	assert list(iterload(StringIO(json_lines), chunk_size=5)) == data
+	assert list(iterload(StringIO('[1, 2]\n[3]\n'), lines=True)) == [[1, 2], [3]]
+	assert list(iterload(StringIO('[]'))) == []
+	assert list(iterload(StringIO(' '))) == []
+	path = join(mkdtemp(), 'pytest-iterload.json.gz')
+	dump(data, path, compression=True)
+	assert list(iterload(path, chunk_size=100)) == data
+	with open(path, 'rb') as fh:
+		assert list(iterload(fh, decompression=True)) == data
+	with raises(TypeError):
+		list(iterload(BytesIO(b'[1, 2]')))
+	assert list(iterload(BytesIO(b'[1, 2]'), conv_str_byte=True)) == [1, 2]
+
+
+def test_dump_load_lines():
+	records = [dict(nr=nr, when=datetime(2020, 1, 2, 3, 4, nr % 60), value=Decimal(nr) / 4) for nr in range(100)]
+	with StringIO() as fh:
+		dump_lines(records, fh)
+		txt = fh.getvalue()
+	assert txt.count('\n') == len(records)
+	assert list(load_lines(StringIO(txt))) == records
+	for compression in [None, True]:
+		path = join(mkdtemp(), 'pytest-lines.jsonl')
+		dump_lines(records[:60], path, compression=compression)
+		dump_lines(records[60:], path, compression=compression, append=True, threads=4)
+		assert list(load_lines(path, chunk_size=50)) == records
+	with raises(ValueError):
+		dump_lines(records, StringIO(), indent=2)
+
+
+def test_iterload_invalid():
+	for txt in ['[1,]', '[1 2]', '[1', '[1] 2', '[1, {"a": }]', '{"a": 1', 'nul']:
+		with raises(ValueError):
+			list(iterload(StringIO(txt), chunk_size=2))
+
+
+def test_iterload_split_tokens():
+	txt = '1.5\n2e+3\n-Infinity\n"a b"\ntrue\n'
+	assert list(iterload(StringIO(txt), chunk_size=1)) == [1.5, 2e+3, float('-inf'), 'a b', True]
+	assert list(iterload(StringIO('[1.5, 2e+3, "a b", null]'), chunk_size=1)) == [1.5, 2e+3, 'a b', None]
+
+
+def test_iterload_early_error():
+	class CountingIO(StringIO):
+		read_size = 0
+		def read(self, size=-1):
+			data = super(CountingIO, self).read(size)
+			self.read_size += len(data)
+			return data
+	body = ''.join(dumps(dict(nr=nr, text='abc' * 10)) + '\n' for nr in range(10000))
+	for txt in ['{"nr": 1,, "x": 2}\n' + body, '{"text": "abc}\n' + body, '[1, 2 3]\n' + body]:
+		fh = CountingIO(txt)
+		with raises(ValueError):
+			list(load_lines(fh, chunk_size=1000))
+		assert fh.read_size <= 4000
+	fh = CountingIO('[{"nr": 1,, "x": 2}, ' + body.replace('\n', ',') + '1]')
+	with raises(ValueError):
+		list(iterload(fh, chunk_size=1000))
+	assert fh.read_size <= 4000
+
+
 test_json_with_comments = """{ # "comment 1
 	"hello": "Wor#d", "Bye": "\\"M#rk\\"", "yes\\\\\\"": 5,# comment" 2
 	"quote": "\\"th#t's\\" what she said", # comment "3"
@@ -217,6 +343,22 @@ def test_string_compression():
 	assert ordered_map == data3
 
 
+@pytest.mark.parametrize('name', list(COMPRESSION_CODECS))
+def test_compression_formats(name):
+	json = dumps(ordered_map, compression=name)
+	assert get_compression(name).matches(json[:8])
+	assert loads(json) == ordered_map
+	assert loads(json, decompression=name) == ordered_map
+	assert loads(dumps(ordered_map, compression=(name, 1))) == ordered_map
+	path = join(mkdtemp(), 'pytest-compression.json')
+	dump(nonpdata, path, compression=name)
+	assert load(path) == nonpdata
+	with open(path, 'rb') as fh:
+		assert list(iterload(fh, lines=True)) == [nonpdata]
+	with raises(ValueError):
+		dumps(ordered_map, compression='nonexistent')
+
+
 def test_flush_no_errors():
 	# just tests that flush doesn't cause problems; checking actual flushing is too messy.
 	path = join(mkdtemp(), 'pytest-nonp.json')
@@ -266,14 +408,40 @@ def test_hooks_called_once_if_comment_before():
 	assert call_count[0] == 1
 
 
-def test_hooks_called_twice_if_comment_after():
+def test_hooks_called_once_if_comment_after():
 	call_count = [0]
 	def counting_hook(obj, *args):
 		call_count[0] += 1
 		return obj
 	result = loads('{"abc": 123} // comment', ignore_comments=None, extra_obj_pairs_hooks=(counting_hook,))
 	assert result == {"abc": 123}
-	assert call_count[0] == 2
+	assert call_count[0] == 1
+
+
+def test_has_comments():
+	assert has_comments(test_json_with_comments)
+	assert has_comments(test_json_with_comments.replace('#', '//'))
+	assert not has_comments(test_json_without_comments)
+	assert not has_comments('{"url": "http://a.b/c#d", "slash": "/", "esc": "\\\\", "q": "\\"#"}')
+	assert has_comments('[1, 2] / 3 // comment')
+	assert not has_comments('["unterminated # string]')
+	assert not has_comments('["a", "b # c", "d"] ')
+	assert has_comments('["a", "b # c", "d"] # e')
+	assert has_comments('["a"]//"b"')
+	assert not has_comments('["a"]/"b"/["c"]')
+	assert strip_comments('[1, 2,  // one\r\n 3]\t# two') == '[1, 2,\r\n 3]'
+
+
+def test_hooks_declared_keys():
+	seen = []
+	@decodes_keys('__point__')
+	def point_hook(dct):
+		seen.append(dict(dct))
+		return (dct['x'], dct['y'])
+	result = loads('[{"x": 1, "y": 2}, {"__point__": null, "x": 3, "y": 4}, {"z": {"y": 6, "x": 5, "__point__": 1}}]',
+		extra_obj_pairs_hooks=(point_hook,))
+	assert result == [{"x": 1, "y": 2}, (3, 4), {"z": (5, 6)}]
+	assert len(seen) == 2
 
 
 def test_order():
@@ -351,6 +519,22 @@ def test_cls_attributes_unchanged():
 	SuperClass.cls_attr = 37
 
 
+def test_cls_lookup_cache():
+	from . import test_class
+	txt = dumps(MyTestCls(s='ub', dct={'7': 7}))
+	assert type(loads(txt)) is MyTestCls
+	class Replacement(MyTestCls):
+		pass
+	test_class.MyTestCls = Replacement
+	try:
+		assert type(loads(txt)) is MyTestCls
+		clear_class_lookup_cache()
+		assert type(loads(txt)) is Replacement
+	finally:
+		test_class.MyTestCls = MyTestCls
+		clear_class_lookup_cache()
+
+
 def test_cls_lookup_map_fail():
 	class LocalCls(object):
 		def __init__(self, val):
@@ -383,6 +567,49 @@ def test_cls_lookup_map_success():
 	assert original[1].value == back[1].value
 
 
+def test_cls_lookup_map_failed_import_cached():
+	from json_tricks import utils
+	class LocalCls(object):
+		def __init__(self, val):
+			self.value = val
+	txt = dumps([LocalCls(k) for k in range(5)])
+	imported = []
+	def counting_import(mod):
+		imported.append(mod)
+		return import_module(mod)
+	utils.import_module = counting_import
+	try:
+		clear_class_lookup_cache()
+		back = loads(txt, cls_lookup_map=dict(LocalCls=LocalCls))
+		assert [obj.value for obj in back] == list(range(5))
+		assert len(imported) == 1
+		with raises(ImportError) as err:
+			loads(txt)
+		assert 'cls_lookup_map' in str(err.value)
+		assert len(imported) == 1
+	finally:
+		utils.import_module = import_module
+		clear_class_lookup_cache()
+
+
+class CountingNew(object):
+	new_calls = 0
+	def __new__(cls, *args, **kwargs):
+		CountingNew.new_calls += 1
+		return super(CountingNew, cls).__new__(cls)
+
+
+def test_cls_encoding_plan_cached():
+	objs = [CountingNew() for _ in range(5)]
+	for nr, obj in enumerate(objs):
+		obj.nr = nr
+	CountingNew.new_calls = 0
+	txt = dumps(objs)
+	txt = dumps(objs)
+	assert CountingNew.new_calls <= 1
+	assert [obj.nr for obj in loads(txt)] == list(range(5))
+
+
 def test_cls_slots():
 	slots = [SlotsBase(), SlotsDictABC(), SlotsStr(), SlotsABCDict(), SlotsABC()]
 	txt = dumps(slots)
@@ -529,6 +756,39 @@ def test_naive_date_time():
 	assert obj == datetime(year=1988, month=3, day=15, hour=8, minute=3, second=59, microsecond=7)
 
 
+def test_compact_naive_date_time():
+	json = dumps(DTOBJ, properties={'datetime_compact': True})
+	assert '"__datetime__": "1988-03-15T08:03:59.000007"' in json
+	assert '"__timedelta__": 176399000000' in json
+	back = loads(json)
+	for orig, bck in zip(DTOBJ, back):
+		assert orig == bck
+		assert type(orig) == type(bck)
+
+
+def test_pack_lists():
+	data = OrderedDict((
+		('when', [datetime(2020, 1, 2, 3, 4, 5, 6), datetime(1960, 1, 1)]),
+		('amounts', (Decimal('1.50'), Decimal('-1e-30'))),
+		('nested', [[Decimal(1)], {'when': [datetime(2020, 1, 1)]}]),
+		('mixed', [datetime(2020, 1, 1), None]),
+		('empty', []),
+	))
+	when = data['when']
+	json = dumps(data, properties={'pack_lists': True})
+	assert data['when'] is when
+	assert '"__datetime_array__": [1577934245000006, -315619200000000]' in json
+	assert '"__decimal_array__": ["1.50", "-1E-30"]' in json
+	assert json.count('__decimal_array__') == 2 and json.count('__datetime_array__') == 2
+	back = loads(json)
+	assert back['when'] == data['when']
+	assert back['amounts'] == list(data['amounts'])
+	assert back['nested'] == data['nested']
+	assert back['mixed'] == data['mixed']
+	assert back['empty'] == []
+	assert '__datetime_array__' not in dumps(data, properties={'pack_lists': 3})
+
+
 def test_primitive_naive_date_time():
 	json = dumps(DTOBJ, primitives=True)
 	back = loads(json)
@@ -671,6 +931,32 @@ def test_fallback_hooks():
 	))
 
 
+def test_encoder_declared_types():
+	seen = []
+	@encodes_types(Decimal)
+	def only_decimals(obj):
+		seen.append(obj)
+		return obj
+	class MyDecimal(Decimal):
+		pass
+	data = [Decimal('1.5'), MyDecimal('2.5'), Fraction(1, 3), 1 + 2j, {'a': 42}]
+	back = loads(dumps(data, extra_obj_encoders=(only_decimals,)))
+	assert seen == [Decimal('1.5'), MyDecimal('2.5')]
+	assert back == data
+
+
+def test_encoder_declared_types_converted():
+	# after one encoder changes the type, encoders for the new type should still run
+	class Wrapper(object):
+		def __init__(self, value):
+			self.value = value
+	@encodes_types(Wrapper)
+	def unwrap(obj):
+		return obj.value
+	txt = dumps([Wrapper(Decimal('3.14')), Wrapper({1, 2})], extra_obj_encoders=(unwrap,))
+	assert loads(txt) == [Decimal('3.14'), {1, 2}]
+
+
 def test_empty_string_with_url():
 	""" Originally for https://github.com/mverleg/pyjson_tricks/issues/51 """
 	txt = '{"foo": "", "bar": "http://google.com"}'
@@ -702,6 +988,24 @@ def test_no_cls():
 	assert data == bck
 
 
+def test_codec():
+	data = [nonpdata, Decimal('1.5'), {1, 2}, datetime(2020, 1, 2, 3, 4, 5), MyTestCls(s='ub', dct={'7': 7})]
+	codec = Codec(dumps_kwargs=dict(indent=2))
+	for _ in range(3):
+		txt = codec.dumps(data)
+		assert txt == dumps(data, indent=2)
+		bck = codec.loads(txt)
+		assert bck[:4] == data[:4]
+		assert bck[4].s == 'ub'
+	codec = Codec(compression=True, preserve_order=False)
+	path = join(mkdtemp(), 'pytest-codec.json.gz')
+	codec.dump(nonpdata, path)
+	assert codec.load(path) == nonpdata
+	assert load(path) == nonpdata
+	with raises(ValueError):
+		codec.dump(path, [1])
+
+
 @pytest.mark.skipif(condition=not is_py3, reason='encoding bytes not supported on python 2')
 def test_utf8_bytes():
 	inputs = [
@@ -751,3 +1055,54 @@ def test_bytes_primitive_repr():
 	bck = loads(json)
 	assert inp == bck
 
+
+def test_references():
+	table = OrderedDict((('a', [1, 2, 3]), ('b', 'text')))
+	inst = MyTestCls(table=table, s='ub')
+	data = OrderedDict((('first', table), ('second', [table, inst]), ('inst', inst), ('other', {'a': [1, 2, 3]})))
+	json = dumps(data, properties={'references': True})
+	assert json.count('"text"') == 1
+	back = loads(json, properties={'references': True})
+	assert back['first'] == table
+	assert back['second'][0] is back['first'] is back['inst'].table
+	assert back['second'][1] is back['inst']
+	assert back['inst'].s == 'ub'
+	assert back['other'] == {'a': [1, 2, 3]}
+	back = loads(dumps(data, sort_keys=True, properties={'references': True}), properties={'references': True})
+	assert back['second'][0] is back['first'] is back['inst'].table
+	loop = [1]
+	loop.append(loop)
+	with raises(ValueError):
+		dumps(loop, properties={'references': True})
+	inner = []
+	inner.append((inner,))
+	for obj in [inner[0], [inner[0]], {'x': inner[0]}]:
+		with raises(ValueError) as err:
+			dumps(obj, properties={'references': True})
+		assert 'Circular reference detected' in str(err.value)
+	with raises(ValueError):
+		loads('[{"__ref__": 0}]', properties={'references': True})
+	# without the property, or if the map is not a reference, __ref__ is a normal key
+	for txt in ['{"__ref__": 3, "value": "x"}', '[{"__ref__": 0}]', '{"__ref__": 0, "equal": true}']:
+		assert loads(txt) == json_loads(txt)
+	for txt in ['{"__ref__": "a", "value": "x"}', '{"__ref__": 0, "value": "x", "more": 1}', '{"__ref__": 0, "equal": 1}']:
+		assert loads(txt, properties={'references': True}) == json_loads(txt)
+	plain = {'__ref__': 3, 'value': 'x'}
+	assert loads(dumps([plain, plain])) == [plain, plain]
+	make = lambda: {'a': (1, 2)}
+	json = dumps([make(), make()], properties={'references': True})
+	assert '__ref__' not in json
+	back = loads(json, properties={'references': True})
+	assert back[0]['a'] == back[1]['a'] and back[0]['a'] is not back[1]['a']
+	codec = Codec(properties={'references': True})
+	assert codec.loads(codec.dumps([table, table]))[0] == table
+	with raises(ValueError):
+		codec.loads('[{"__ref__": 0}]')
+
+
+def test_dump_encoding_error_without_file_hint():
+	class Unknown(object):
+		__slots__ = ()
+	with raises(TypeError) as err:
+		dump([Unknown()], StringIO(), obj_encoders=())
+	assert 'binary mode' not in str(err.value)
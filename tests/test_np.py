@@ -2,19 +2,22 @@
 # -*- coding: utf-8 -*-
 
 from copy import deepcopy
+from os import listdir
 from os.path import join
 from tempfile import mkdtemp
 import sys
 from warnings import catch_warnings, simplefilter
 
-from pytest import warns
-from numpy import arange, ones, array, array_equal, finfo, iinfo, pi
+import pytest
+from pytest import warns, raises
+from numpy import arange, ones, array, array_equal, finfo, iinfo, pi, memmap, asfortranarray
 from numpy import int8, int16, int32, int64, uint8, uint16, uint32, uint64, \
-	float16, float32, float64, complex64, complex128, zeros, ndindex
+	float16, float32, float64, complex64, complex128, zeros, ndindex, empty
 from numpy.core.umath import exp
 from numpy.testing import assert_equal
 
 from json_tricks import numpy_encode
+from json_tricks.compression import COMPRESSION_CODECS, get_compression
 from json_tricks.np import dump, dumps, load, loads
 from json_tricks.np_utils import encode_scalars_inplace
 from json_tricks.utils import JsonTricksDeprecation, gzip_decompress
@@ -204,6 +207,24 @@ def test_ndarray_object_nesting():
 	assert array_equal(before[0, 0], after[0, 0])
 
 
+def test_ndarray_object_shapes():
+	before = empty((2, 3, 4), dtype=object)
+	for k, i in enumerate(ndindex(before.shape)):
+		before[i] = None if k % 3 else 'cell {0:d}'.format(k)
+	before[1, 2, 3] = ['inner', 'list']
+	before[0, 1, 2] = []
+	for arr in (before, asfortranarray(before[0]), before[:, :0], empty((0,), dtype=object)):
+		after = loads(dumps(arr))
+		assert after.shape == arr.shape
+		assert after.dtype == arr.dtype
+		for i in ndindex(arr.shape):
+			assert after[i] == arr[i]
+	with raises(ValueError):
+		loads('{"__ndarray__": [["a", "b"], "cd"], "dtype": "object", "shape": [2, 2]}')
+	with raises(ValueError):
+		loads('{"__ndarray__": [["a", "b"], ["c"]], "dtype": "object", "shape": [2, 2]}')
+
+
 def test_dtype_object():
 	# Based on issue 64
 	arr = array(['a', 'b', 'c'], dtype=object)
@@ -350,6 +371,25 @@ def test_decode_compact_inline_compression():
 	assert_equal(data[0], array([[1.0, 2.0, 3.0, 4.0], [5.0, 6.0, 7.0, 8.0], [9.0, 10.0, 11.0, 12.0], [13.0, 14.0, 15.0, 16.0]]))
 
 
+@pytest.mark.parametrize('name', list(COMPRESSION_CODECS))
+def test_compact_inline_compression_formats(name):
+	data = [arange(4000, dtype=float64).reshape((40, 100)), array([1.0, 2.0])]
+	json = dumps(data, properties=dict(ndarray_compact=True, ndarray_compression=name))
+	assert '"b64.{0:s}:'.format(get_compression(name).tag) in json
+	assert '"b64:' in json
+	data2 = loads(json)
+	assert_equal(data2[0], data[0])
+	assert_equal(data2[1], data[1])
+	json = dumps(data, properties=dict(ndarray_compact=True, ndarray_compression=False))
+	assert '"b64.' not in json
+
+
+def test_decode_compact_unknown_compression():
+	json = '{"__ndarray__": "b64.nonexistent:AAAAAAAA8D8=", "dtype": "float64", "shape": [1]}'
+	with raises(ValueError):
+		loads(json)
+
+
 def test_decode_compact_no_inline_compression():
 	json = '[{"__ndarray__": "b64:AAAAAAAA8D8AAAAAAAAAQAAAAAAAAAhAAAAAAAAAEEA=", ' \
 		'"dtype": "float64", "shape": [2, 2], "Corder": true, "endian": "little"}]'
@@ -383,3 +423,93 @@ def test_decode_writeable():
 
     assert reloaded_uncompressed.flags.writeable
     assert reloaded_compressed.flags.writeable
+
+
+def test_sidecar():
+	directory = mkdtemp()
+	data = dict(big=arange(1000, dtype=float32).reshape((10, 100)), fortran=asfortranarray(ones((20, 5))),
+		small=arange(5), scalar=pi)
+	json = dumps(data, properties=dict(ndarray_sidecar=directory, ndarray_sidecar_min_size=50))
+	assert len(listdir(directory)) == 2
+	assert '"npy:ndarray-' in json
+	assert dumps(data, properties=dict(ndarray_sidecar=directory, ndarray_sidecar_min_size=50)) == json
+	data['big'][0, 0] = -1
+	dumps(data, properties=dict(ndarray_sidecar=directory, ndarray_sidecar_min_size=50))
+	assert len(listdir(directory)) == 3
+	data['big'][0, 0] = 0
+	back = loads(json, properties=dict(ndarray_sidecar=directory))
+	assert isinstance(back['big'], memmap)
+	assert not back['big'].flags.writeable
+	for key in ['big', 'fortran', 'small']:
+		assert_equal(back[key], data[key])
+		assert back[key].dtype == data[key].dtype
+	assert not isinstance(back['small'], memmap)
+	back = loads(json, properties=dict(ndarray_sidecar=directory, ndarray_mmap_mode=None))
+	assert not isinstance(back['big'], memmap)
+	assert_equal(back['big'], data['big'])
+
+
+def test_sidecar_new_directory():
+	directory = join(mkdtemp(), 'arrays', 'nested')
+	json = dumps(arange(10), properties=dict(ndarray_sidecar=directory))
+	assert len(listdir(directory)) == 1
+	assert_equal(loads(json, properties=dict(ndarray_sidecar=directory)), arange(10))
+
+
+def test_sidecar_missing():
+	json = dumps(arange(10), properties=dict(ndarray_sidecar=mkdtemp()))
+	with raises(IOError):
+		loads(json, properties=dict(ndarray_sidecar=mkdtemp()))
+	with raises(ValueError):
+		loads(json.replace('npy:', 'npy:../'))
+
+
+def test_decode_compact_wrong_size():
+	for compression in [False, True]:
+		json = dumps(arange(1000, dtype=float64), compression=compression, properties=dict(ndarray_compact=True))
+		json = loads(json, decompression=compression, obj_pairs_hooks=())
+		for shape in [[999], [1001]]:
+			json['shape'] = shape
+			with raises(ValueError):
+				loads(dumps(json))
+
+
+def test_references():
+	arr = arange(100).reshape((10, 10))
+	data = {'a': arr, 'b': [arr, arr], 'c': arr.copy()}
+	json = dumps(data, properties={'references': True, 'ndarray_compact': True})
+	assert json.count('__ndarray__') == 2
+	back = loads(json, properties={'references': True})
+	assert back['a'] is back['b'][0] is back['b'][1]
+	assert back['c'] is not back['a']
+	assert array_equal(back['a'], arr) and array_equal(back['c'], arr)
+
+
+def test_ndarray_dedup():
+	data = {'masks': [arange(100) % 3 == 0 for _ in range(4)], 'other': arange(100), 'lists': [[1], [1]]}
+	json = dumps(data, properties={'ndarray_dedup': True, 'ndarray_compact': True})
+	assert json.count('__ndarray__') == 2
+	assert json.count('"equal": true') == 3
+	back = loads(json, properties={'ndarray_dedup': True})
+	assert array_equal(back['masks'][3], data['masks'][3])
+	assert back['masks'][0].flags.writeable
+	assert not back['masks'][1].flags.writeable
+	assert back['masks'][1].base is back['masks'][0]
+	assert back['lists'][0] is not back['lists'][1]
+	back = loads(json, properties={'ndarray_dedup_copy': True})
+	assert back['masks'][1].flags.writeable
+	assert back['masks'][1] is not back['masks'][0]
+	assert array_equal(back['masks'][1], data['masks'][0])
+	# only the same dtype and shape count as equal
+	json = dumps([arange(4, dtype='int32'), arange(4, dtype='int64'), arange(4, dtype='int32').reshape((2, 2))],
+		properties={'ndarray_dedup': True})
+	assert json.count('__ndarray__') == 3
+	# 0-d arrays are loaded as scalars, which cannot be shared as views
+	json = dumps([array(5), array(5)], properties={'ndarray_dedup': True})
+	assert '__ref__' not in json
+	assert loads(json, properties={'ndarray_dedup': True}) == [5, 5]
+	loop = [arange(3)]
+	loop.append(loop)
+	with raises(ValueError) as err:
+		dumps(loop, properties={'ndarray_dedup': True})
+	assert 'Circular reference detected' in str(err.value)
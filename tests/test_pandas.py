@@ -2,9 +2,9 @@
 # -*- coding: utf-8 -*-
 
 from collections import OrderedDict
-from numpy import linspace, isnan
+from numpy import linspace, isnan, arange
 from numpy.testing import assert_equal
-from pandas import DataFrame, Series
+from pandas import DataFrame, Series, Categorical, date_range, to_timedelta, NaT, array as pd_array
 from json_tricks import dumps, loads
 from tests.test_bare import nonpdata
 
@@ -68,3 +68,64 @@ def test_pandas_mixed_with_other_types():
 	assert mixed == back
 
 
+def test_pandas_columnar():
+	df = DataFrame(COLUMNS, columns=tuple(COLUMNS.keys()), index=['r{0:d}'.format(k) for k in range(10)])
+	for properties in (dict(pandas_columnar=True), dict(pandas_columnar=True, ndarray_compact=True)):
+		txt = dumps([df, df['real']], allow_nan=True, properties=properties)
+		back = loads(txt)
+		assert df.equals(back[0])
+		assert (df.dtypes == back[0].dtypes).all()
+		assert list(df.index) == list(back[0].index)
+		assert df['real'].equals(back[1])
+	txt = dumps(df, allow_nan=True, properties=dict(pandas_columnar=True, ndarray_compact=True))
+	assert txt.count('"b64') == 3
+	assert txt == dumps(df, allow_nan=True, properties=dict(pandas_columnar=True, ndarray_compact=True))
+	assert '__ndarray__' not in dumps(df, allow_nan=True, primitives=True, properties=dict(pandas_columnar=True))
+	dated = DataFrame(OrderedDict((
+		('when', date_range('2020-01-01', periods=4, freq='h')),
+		('took', to_timedelta([1, 2, 3, 4], unit='s')),
+	)), index=date_range('2021-06-01', periods=4))
+	dated.loc[dated.index[2], 'when'] = NaT
+	for properties in (dict(), dict(pandas_columnar=True), dict(pandas_columnar=True, ndarray_compact=True)):
+		back = loads(dumps(dated, properties=properties))
+		assert dated.equals(back)
+		assert (dated.dtypes == back.dtypes).all()
+		assert dated.index.equals(back.index)
+		assert dated.index.dtype == back.index.dtype
+		back = loads(dumps(dated['took'], properties=properties))
+		assert dated['took'].equals(back)
+		assert dated.index.equals(back.index)
+
+
+def test_pandas_columnar_numeric_index():
+	df = DataFrame(OrderedDict((('a', arange(50)), ('b', arange(50) / 3.))), index=arange(50) * 2)
+	back = loads(dumps(df, properties=dict(pandas_columnar=True, ndarray_compact=True)))
+	assert df.equals(back)
+	assert df.index.equals(back.index)
+	assert back['b'].values.flags['C_CONTIGUOUS']
+	back = loads(dumps(df['b'], properties=dict(pandas_columnar=True, ndarray_compact=True)))
+	assert df['b'].equals(back)
+	assert df.index.equals(back.index)
+
+
+def test_pandas_extension_dtypes():
+	df = DataFrame(OrderedDict((
+		('cat', Categorical(['a', 'b', 'a', None], categories=['b', 'a'], ordered=True)),
+		('tz', date_range('2020-01-01', periods=4, tz='Europe/Amsterdam')),
+		('int', pd_array([1, None, 3, 4], dtype='Int64')),
+		('bool', pd_array([True, None, False, True], dtype='boolean')),
+		('text', pd_array(['x', None, 'z', 'w'], dtype='string')),
+	)))
+	df.loc[2, 'tz'] = NaT
+	for properties in (dict(), dict(pandas_columnar=True, ndarray_compact=True)):
+		txt = dumps(df, properties=properties)
+		back = loads(txt)
+		assert df.equals(back)
+		assert (df.dtypes == back.dtypes).all()
+		for name in df.columns:
+			back = loads(dumps(df[name], properties=properties))
+			assert df[name].equals(back)
+			assert df[name].dtype == back.dtype
+	indexed = df.set_index('tz')
+	assert indexed.index.equals(loads(dumps(indexed)).index)
+	assert '"codes": [1, 0, 1, -1]' in dumps(df)
@@ -7,7 +7,11 @@ work with just Python code functionality, and are tested in `nonp`.
 """
 
 from datetime import datetime, date, time, timedelta, timezone
+from os.path import abspath, dirname
+from subprocess import check_call
+from sys import executable
 from json_tricks import dumps, loads
+from json_tricks.decoders import get_timezone
 from json_tricks.utils import is_py3
 import pytz
 
@@ -107,3 +111,72 @@ def test_after_dst_fold():
     assert back == after_dst
     assert back.tzinfo.zone == after_dst.tzinfo.zone
     assert back.utcoffset() == after_dst.utcoffset()
+
+
+def test_compact_tzaware_date_time():
+    json = dumps(DTOBJ, properties={'datetime_compact': True})
+    back = loads(json)
+    for orig, bck in zip(DTOBJ, back):
+        assert orig == bck
+        assert type(orig) == type(bck)
+    paris = pytz.timezone("Europe/Paris")
+    for hour in (0, 1):
+        # both sides of the DST fold, which have the same local time
+        dt = datetime(2023, 10, 29, hour, 30, 0, 0, pytz.UTC).astimezone(paris)
+        json = dumps(dt, properties={'datetime_compact': True})
+        assert '"tzinfo": "Europe/Paris"' in json
+        back = loads(json)
+        assert back == dt
+        assert back.tzinfo.zone == dt.tzinfo.zone
+        assert back.utcoffset() == dt.utcoffset()
+    txt = '{"__datetime__": "1988-03-15T08:03:59.000007", "tzinfo": "Europe/Amsterdam"}'
+    assert loads(txt) == pytz.timezone('Europe/Amsterdam').localize(datetime(1988, 3, 15, 8, 3, 59, 7))
+
+
+def test_pack_tzaware_lists():
+    amsterdam = pytz.timezone('Europe/Amsterdam')
+    data = [amsterdam.localize(datetime(2023, 3, 26, 1, 30)),
+        amsterdam.localize(datetime(2023, 10, 29, 2, 30), is_dst=True),
+        amsterdam.localize(datetime(2023, 10, 29, 2, 30), is_dst=False)]
+    json = dumps(data, properties={'pack_lists': True})
+    assert '"tzinfo": "Europe/Amsterdam"' in json
+    back = loads(json)
+    for orig, bck in zip(data, back):
+        assert orig == bck
+        assert bck.tzinfo.zone == orig.tzinfo.zone
+        assert bck.utcoffset() == orig.utcoffset()
+    # only named timezones that are the same for all items are packed
+    for unpacked in ([data[0], pytz.timezone('Europe/Paris').localize(datetime(2023, 1, 1))],
+            [datetime.now(timezone.utc)], [data[0], datetime(2023, 1, 1)]):
+        assert '__datetime_array__' not in dumps(unpacked, properties={'pack_lists': True})
+
+
+def test_timezone_cache():
+    assert get_timezone('Europe/Amsterdam') is get_timezone('Europe/Amsterdam')
+    assert get_timezone('Europe/Amsterdam') is pytz.timezone('Europe/Amsterdam')
+    # the cache is bounded, but keeps the timezones that are used often
+    get_timezone.cache_clear()
+    others = [name for name in pytz.common_timezones if name != 'UTC'][:300]
+    for name in others:
+        get_timezone(name)
+        get_timezone('UTC')
+    assert get_timezone.cache_info().misses == len(others) + 1
+    assert get_timezone.cache_info().currsize <= 256
+    get_timezone.cache_clear()
+
+
+def test_zoneinfo_without_pytz():
+    code = '\n'.join((
+        'import sys',
+        'sys.modules["pytz"] = None',
+        'from datetime import datetime',
+        'from zoneinfo import ZoneInfo',
+        'from json_tricks import dumps, loads',
+        'paris = ZoneInfo("Europe/Paris")',
+        'for fold in (0, 1):',
+        '    dt = datetime(2023, 10, 29, 2, 30, tzinfo=paris, fold=fold)',
+        '    for props in ({}, {"datetime_compact": True}):',
+        '        back = loads(dumps(dt, properties=props))',
+        '        assert back == dt and back.tzinfo is paris and back.utcoffset() == dt.utcoffset(), (dt, back)',
+    ))
+    check_call([executable, '-c', code], cwd=dirname(dirname(abspath(__file__))))
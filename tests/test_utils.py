@@ -1,7 +1,12 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from json_tricks.utils import hashodict, get_arg_names, nested_index
+from os.path import abspath, dirname
+from subprocess import check_call
+from sys import executable
+
+from json_tricks.utils import hashodict, get_arg_names, nested_index, filtered_wrapper, get_cached_arg_names, \
+	encodes_types, get_encoder_types, matches_encoder_types
 
 
 def test_hashodict():
@@ -17,6 +22,22 @@ def test_get_args():
 	assert argnames == set(('hello', 'world'))
 
 
+def test_filtered_wrapper():
+	def only_primitives(obj, primitives=False):
+		return (obj, primitives)
+	def nothing(obj):
+		return obj
+	class Enc(object):
+		def default(self, obj, properties=None, is_changed=None):
+			return (obj, is_changed, properties)
+	names = ('primitives', 'is_changed', 'properties')
+	assert filtered_wrapper(only_primitives, names)(1, primitives=True, is_changed=False, properties={}) == (1, True)
+	assert filtered_wrapper(nothing, names)(2, primitives=True, is_changed=False, properties={}) == 2
+	assert filtered_wrapper(Enc(), names)(3, primitives=True, is_changed=False, properties={}) == (3, False, {})
+	assert filtered_wrapper(only_primitives)(4, properties={}) == (4, False)
+	assert get_cached_arg_names(only_primitives) is get_cached_arg_names(only_primitives)
+
+
 def test_nested_index():
 	arr = [[[1, 2], [1, 2]], [[1, 2], [3, 3]]]
 	assert 1 == nested_index(arr, (0, 0, 0,))
@@ -60,3 +81,29 @@ def base85_vsbase64_performance():
 
 	# Result on local PC in 2020: base84 is 53x slower to encode
 	# (urlsafe also costs a bit of performance, about 2x)
+
+
+def test_matches_encoder_types():
+	types = get_encoder_types(encodes_types(int, 'collections.OrderedDict', 'not_a_real_module.Thing')(lambda obj: obj))
+	assert types == (int, ('collections', 'OrderedDict'), ('not_a_real_module', 'Thing'))
+	assert matches_encoder_types(bool, types)
+	assert matches_encoder_types(hashodict, types)
+	assert not matches_encoder_types(str, types)
+	assert matches_encoder_types(str, None)
+
+
+def test_lazy_optional_imports():
+	code = '\n'.join((
+		'import sys',
+		'from json_tricks import Codec',
+		'assert "numpy" not in sys.modules and "pandas" not in sys.modules, "imported optional dependency"',
+		'codec = Codec()',
+		'assert codec.dumps([1, 2]) == "[1, 2]"',
+		'assert "numpy" not in sys.modules and "pandas" not in sys.modules, "imported optional dependency"',
+		'try:',
+		'	import numpy',
+		'except ImportError:',
+		'	sys.exit(0)',
+		'assert (codec.loads(codec.dumps(numpy.arange(3))) == numpy.arange(3)).all()',
+	))
+	check_call([executable, '-c', code], cwd=dirname(dirname(abspath(__file__))))